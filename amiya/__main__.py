@@ -1,21 +1,116 @@
+import argparse
 import asyncio
+import importlib
 import logging
 import os
+import sys
+import time
 from pathlib import Path
 
 from discord.ext import commands
 from dotenv import load_dotenv
 
-from amiya.utils import constants, discord_common
+from amiya.utils import akhr, arknights, async_arknights, constants, discord_common, guild_locales, metrics, paginator, snapshot
 
 load_dotenv()
 
+# Loaded before the game data, the other cogs are rarely used
+CORE_COGS = ["general", "operator"]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(prog="python -m amiya")
+    subparsers = parser.add_subparsers(dest="command")
+
+    # python -m amiya snapshot [--locale en-US]
+    snapshot_parser = subparsers.add_parser(
+        "snapshot", help="Compile the game data into binary snapshots for fast cold starts")
+    snapshot_parser.add_argument(
+        "--locale", action="append", help=f"Data locale, can be repeated (default: {', '.join(arknights.LOCALES)})")
+
+    return parser.parse_args()
+
+
+async def initialize(bot) -> bool:
+    """
+    Loads the cogs and the game data in the background, shutting the bot down if that fails
+
+    Returns:
+        bool: Whether everything was loaded
+    """
+
+    try:
+        await load(bot)
+    except Exception:
+        logging.exception("Startup failed, shutting down")
+        await bot.close()
+        return False
+    return True
+
+
+async def load(bot):
+    """ Loads the cogs and the game data, data commands wait for the game data """
+
+    loop = asyncio.get_event_loop()
+    start = time.perf_counter()
+
+    # Most used cogs first, the others follow once the game data loads
+    cogs = sorted(file.stem for file in Path("amiya", "cogs").glob("*.py"))
+    core, others = [x for x in cogs if x in CORE_COGS], [x for x in cogs if x not in CORE_COGS]
+
+    async def load_extensions(extensions):
+        for extension in extensions:
+            # Imported in a worker thread so that connecting isn't held up, then set up on the event loop
+            await loop.run_in_executor(None, importlib.import_module, f"amiya.cogs.{extension}")
+            bot.load_extension(f"amiya.cogs.{extension}")
+
+    await load_extensions(core)
+
+    # Load constants
+    await loop.run_in_executor(None, constants.setup)
+    logging.info(f'Constants loaded: {", ".join(filter(lambda x: x.isupper(), dir(constants)))}')
+
+    # Load the locale chosen by each guild
+    await loop.run_in_executor(None, guild_locales.load)
+
+    # Serve the cached akhr.json right away and keep it fresh in the background
+    await loop.run_in_executor(None, akhr.load)
+    loop.create_task(akhr.refresh_loop())
+
+    # Load every table, data commands wait for it
+    # Set WARM_UP=false to load tables lazily on first use instead
+    async def warm_up():
+        try:
+            await loop.run_in_executor(None, arknights.warm_up)
+        except Exception:
+            logging.exception("Data warm-up failed, falling back to lazy loading")
+            arknights.ready.set()
+
+    if os.getenv("WARM_UP", "true").lower() in ("1", "true", "yes"):
+        warm_up_task = loop.create_task(warm_up())
+    else:
+        arknights.ready.set()
+        warm_up_task = None
+
+    await load_extensions(others)
+    logging.info(f'Cogs loaded: {", ".join(bot.cogs)}')
+
+    if warm_up_task is not None:
+        await warm_up_task
+    logging.info(f"Ready in {time.perf_counter() - start:.1f} s")
+
+    # Reload the game data when ArknightsData changes, polling every DATA_WATCH_INTERVAL seconds
+    watch_interval = float(os.getenv("DATA_WATCH_INTERVAL", 0))
+    if watch_interval > 0:
+        loop.create_task(async_arknights.watch(watch_interval))
+
+    # Write the metrics for a local scraper every METRICS_INTERVAL seconds
+    if metrics.METRICS_PATH:
+        loop.create_task(metrics.export_loop())
+
 
 def main():
-    token = os.getenv("DISCORD_TOKEN")
-    if not token:
-        logging.error("Discord Token required")
-        return
+    args = parse_args()
 
     # Config logging
     logging.basicConfig(
@@ -25,21 +120,21 @@ def main():
         level=logging.INFO,
     )
 
+    if args.command == "snapshot":
+        for data_locale in args.locale or arknights.LOCALES:
+            snapshot.build(data_locale)
+        return
+
+    token = os.getenv("DISCORD_TOKEN")
+    if not token:
+        logging.error("Discord Token required")
+        return
+
     # Auto shard
     bot = commands.AutoShardedBot(
         command_prefix=commands.when_mentioned_or(os.getenv("PREFIX"))
     )
 
-    cogs = [file.stem for file in Path("amiya", "cogs").glob("*.py")]
-    # Load extensions
-    for extension in cogs:
-        bot.load_extension(f"amiya.cogs.{extension}")
-    logging.info(f'Cogs loaded: {", ".join(bot.cogs)}')
-
-    # Load constants
-    constants.setup()
-    logging.info(f'Constants loaded: {", ".join(filter(lambda x: x.isupper(), dir(constants)))}')
-
     def no_dm_check(ctx):
         """ Check for DMs """
         if ctx.guild is None:
@@ -49,13 +144,46 @@ def main():
     # Restrict bot usage to inside guild channels only.
     bot.add_check(no_dm_check)
 
+    # Track how long each command blocks the event loop, and how long it takes to respond
+    lag_monitor = discord_common.LoopLagMonitor(
+        budget=float(os.getenv("LOOP_LAG_BUDGET", 0.1)))
+
+    async def before_invoke(ctx):
+        await lag_monitor.before_invoke(ctx)
+        await metrics.before_invoke(ctx)
+
+    async def after_invoke(ctx):
+        await lag_monitor.after_invoke(ctx)
+        await metrics.after_invoke(ctx)
+
+    bot.before_invoke(before_invoke)
+    bot.after_invoke(after_invoke)
+
+    # Route reactions to the running paginators
+    bot.add_listener(paginator.router.on_reaction_add)
+
+    # Connect right away, cogs and game data are loaded meanwhile
+    initialization = bot.loop.create_task(initialize(bot))
+
+    # Sampled from the start, once
+    bot.loop.create_task(lag_monitor.run())
+
+    # on_ready fires again after every reconnect, the presence loop is only started the first time
+    presence = None
+
     @bot.event
     async def on_ready():
-        asyncio.create_task(discord_common.presence(bot))
+        nonlocal presence
+        if presence is None:
+            presence = asyncio.create_task(discord_common.presence(bot))
         logging.info("Successfully logged in and booted...!")
 
     bot.run(token)
 
+    # Fail loudly, as when everything was loaded before connecting
+    if initialization.done() and not initialization.cancelled() and not initialization.result():
+        sys.exit(1)
+
 
 if __name__ == "__main__":
     main()
@@ -1,11 +1,10 @@
 import logging
 import re
-from itertools import combinations
 
 from discord import Embed
 from discord.ext import commands
 
-from amiya.utils import arknights, constants, discord_common
+from amiya.utils import arknights, async_arknights, constants, discord_common, guild_locales
 
 
 class GeneralCogError(commands.CommandError):
@@ -16,6 +15,14 @@ class General(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
 
+    async def cog_check(self, ctx):
+        """ Check for game data readiness, and pin the version of the guild locale for the whole command """
+        if not arknights.ready.is_set():
+            raise GeneralCogError("Still warming up, please try again in a few seconds!")
+        arknights.pin(guild_locales.get_locale(
+            ctx.guild.id if ctx.guild is not None else None))
+        return True
+
     @commands.command(brief="Shows infos of a stage", usage="[stage]")
     async def stage(self, ctx, *stage: str):
         """
@@ -27,10 +34,20 @@ class General(commands.Cog):
         if stage is None:
             raise GeneralCogError("You need to provide a stage name or id!")
 
+        # Resolve the stage, the embed only depends on its ID and flags
+        stage_id = (await async_arknights.get_stage_info(stage))["stageId"]
+        challenge_mode = "+cm" in stage
+        await discord_common.send_cached_embed(
+            ctx, arknights.pinned().render_cache, ("stage", stage_id, challenge_mode),
+            lambda: self.render_stage(stage_id, challenge_mode))
+
+    async def render_stage(self, stage_id, challenge_mode):
+        """ Builds the ;stage embed """
+
         # Get stage info
-        info, extra_info, anni_info = arknights.get_stage(stage)
+        info, extra_info, anni_info = await async_arknights.get_stage(stage_id)
 
-        title = f'[{info["code"]}] {info["name"]} {"(Challenge Mode)" if "+cm" in stage else ""}'
+        title = f'[{info["code"]}] {info["name"]} {"(Challenge Mode)" if challenge_mode else ""}'
 
         # Check if stage is boss stage
         if info["bossMark"] is True:
@@ -51,7 +68,7 @@ class General(commands.Cog):
             general += f'• Sanity Cost : {info["apCost"]}\n• Practice Ticket Cost : {max(0, info["practiceTicketCost"])}\n• EXP Gain : {info["expGain"]}\n• LMD Gain : {info["goldGain"]}\n• Favor Gain : {info["completeFavor"]}'
         if len(info["unlockCondition"]) > 0:
             unlock_condition = [
-                f'{"Clear" if st["completeState"] == 2 else "Perfect"} **{arknights.get_stage(st["stageId"])[0]["code"]}**' for st in info["unlockCondition"]]
+                f'{"Clear" if st["completeState"] == 2 else "Perfect"} **{(await async_arknights.get_stage_info(st["stageId"]))["code"]}**' for st in info["unlockCondition"]]
             general += f'\n• Unlock Conditions : {", ".join(unlock_condition)}'
         if info["slProgress"] > 0:
             general += f'\n• Storyline Progress : {info["slProgress"]}%'
@@ -60,11 +77,11 @@ class General(commands.Cog):
 
         # Challenge Mode info
         if info["hardStagedId"] is not None:
-            challenge_mode = arknights.get_stage(info["hardStagedId"])[0]
+            challenge_mode = await async_arknights.get_stage_info(info["hardStagedId"])
             challenge_general = ""
             if len(challenge_mode["unlockCondition"]) > 0:
                 unlock_condition = [
-                    f'{"Clear" if st["completeState"] == 2 else "Perfect"} **{arknights.get_stage(st["stageId"])[0]["code"]}**' for st in challenge_mode["unlockCondition"]]
+                    f'{"Clear" if st["completeState"] == 2 else "Perfect"} **{(await async_arknights.get_stage_info(st["stageId"]))["code"]}**' for st in challenge_mode["unlockCondition"]]
                 challenge_general += f'• Unlock Conditions : {", ".join(unlock_condition)}'
             challenge_description = pattern.sub(
                 r"**\1**", challenge_mode["description"])
@@ -76,70 +93,58 @@ class General(commands.Cog):
         stage_info = f'• Deployment Limit : {extra_options["characterLimit"]}\n• Life Points : {extra_options["maxLifePoint"]}\n• Initial DP : {extra_options["initialCost"]}'
         embed.add_field(name="Map Information", value=stage_info, inline=False)
 
-        # Enemies info
-        # Count enemies by extracting waves
-        # I can't really find a better way to do this, maybe the database is missing some parts ?
-        enemies_waves = extra_info["waves"]
-        enemies_count = {}
-        for wave in enemies_waves:
-            for fragment in wave["fragments"]:
-                for action in fragment["actions"]:
-                    if action["actionType"] == 0:
-                        enemy = arknights.get_enemy(action["key"])
-                        if enemy["name"] not in enemies_count:
-                            enemies_count[enemy["name"]] = {
-                                "sort": enemy["sortId"],
-                                "count": 0
-                            }
-                        enemies_count[enemy["name"]
-                                      ]["count"] += action["count"]
-        enemies_count = {k: v for k, v in sorted(
-            enemies_count.items(), key=lambda item: item[1]["sort"])}
+        # Enemies info (counted by the level summary, sorted by sortId)
         embed.add_field(name="Enemies", value="\n".join(
-            [f'• {enemy[1]["count"]}x {enemy[0]}' for enemy in enemies_count.items()]), inline=False)
+            [f'• {count}x {name}' for name, count in extra_info["enemies"]]), inline=False)
+
+        # Every reward is resolved in one lookup, annihilation first clear rewards included
+        display_rewards = info["stageDropInfo"]["displayRewards"]
+        extra_rewards = [y for y in info["stageDropInfo"]["displayDetailRewards"]
+                         if y["dropType"] == 4]  # Extra Drops
+        ladder_rewards = [reward for ladder in anni_info["breakLadders"]
+                          for reward in ladder["rewards"]] if anni_info is not None else []
+        records = await async_arknights.get_rewards(display_rewards + extra_rewards + ladder_rewards)
+        display = list(zip(display_rewards, records))
+        extra_drops = list(zip(extra_rewards, records[len(display_rewards):]))
+        reward_names = {reward["id"]: x["name"] for reward, x in zip(
+            ladder_rewards, records[len(display_rewards) + len(extra_rewards):])}
+
+        def reward_line(reward, x):
+            """ Items are shown with their ID, operators and furniture by name only """
+            if reward["type"] in ("TKT_RECRUIT", "FURN"):
+                return f'• {x["name"]}'
+            return f'• {x["name"]} (`{x["itemId"]}`)'
 
         # Filter Originite Prime
         first = [
-            f'• {x["name"]} (`{x["itemId"]}`)'
-            for x in [
-                arknights.get_item(y["id"])
-                for y in info["stageDropInfo"]["displayRewards"]
-                if y["dropType"] == 8  # First clear item (Originite Prime)
-            ]
+            reward_line(y, x)
+            for y, x in display
+            if y["dropType"] == 8  # First clear item (Originite Prime)
         ]
         # Filter items
         first.extend(
             [
                 f'• {x["name"]} (`{x["itemId"]}`)'
-                for x in [
-                    arknights.get_item(y["id"])
-                    for y in info["stageDropInfo"]["displayRewards"]
-                    if y["dropType"] == 1  # First clear (others)
-                    and y["type"] != "TKT_RECRUIT"  # Operator
-                    and y["type"] != "FURN"  # Furniture
-                ]
+                for y, x in display
+                if y["dropType"] == 1  # First clear (others)
+                and y["type"] != "TKT_RECRUIT"  # Operator
+                and y["type"] != "FURN"  # Furniture
             ]
         )
         # Filter operator
         first.extend(
             [
                 f'• {x["name"]}'
-                for x in [
-                    arknights.get_operator_info(y["id"])
-                    for y in info["stageDropInfo"]["displayRewards"]
-                    if y["dropType"] == 1 and y["type"] == "TKT_RECRUIT"  # Operator
-                ]
+                for y, x in display
+                if y["dropType"] == 1 and y["type"] == "TKT_RECRUIT"  # Operator
             ]
         )
         # Filter furniture
         first.extend(
             [
                 f'• {x["name"]}'
-                for x in [
-                    arknights.get_furniture(y["id"])
-                    for y in info["stageDropInfo"]["displayRewards"]
-                    if y["dropType"] == 1 and y["type"] == "FURN"  # Furniture
-                ]
+                for y, x in display
+                if y["dropType"] == 1 and y["type"] == "FURN"  # Furniture
             ]
         )
         # Always check for length
@@ -151,12 +156,9 @@ class General(commands.Cog):
 
         # Filter regular drops
         regular = [
-            f'• {x["name"]} (`{x["itemId"]}`)'
-            for x in [
-                arknights.get_item(y["id"])
-                for y in info["stageDropInfo"]["displayRewards"]
-                if y["dropType"] == 2  # Fixed
-            ]
+            reward_line(y, x)
+            for y, x in display
+            if y["dropType"] == 2  # Fixed
         ]
         # Always check for length
         if len(regular) > 0:
@@ -166,12 +168,9 @@ class General(commands.Cog):
 
         # Filter special drops
         special = [
-            f'• {x["name"]} (`{x["itemId"]}`)'
-            for x in [
-                arknights.get_item(y["id"])
-                for y in info["stageDropInfo"]["displayRewards"]
-                if y["dropType"] == 3  # Special Drops
-            ]
+            reward_line(y, x)
+            for y, x in display
+            if y["dropType"] == 3  # Special Drops
         ]
         # Always check for length
         if len(special) > 0:
@@ -180,14 +179,7 @@ class General(commands.Cog):
             )
 
         # Filter extra drops
-        extra = [
-            f'• {x["name"]} (`{x["itemId"]}`)'
-            for x in [
-                arknights.get_item(y["id"])
-                for y in info["stageDropInfo"]["displayDetailRewards"]
-                if y["dropType"] == 4  # Extra Drops
-            ]
-        ]
+        extra = [reward_line(y, x) for y, x in extra_drops]
         # Always check for length
         if len(extra) > 0:
             embed.add_field(
@@ -201,7 +193,7 @@ class General(commands.Cog):
             first_clear = anni_info["breakLadders"]
             endl = "\n"  # Backslashes may not appear inside the expression portions of f-strings
             embed.add_field(name="First Clear", value=endl.join(
-                [f'''**{ladder["killCnt"]}** kills\n{endl.join([f"• {reward['count']} {arknights.get_item(reward['id'])['name']} (`{reward['id']}`)" for reward in ladder["rewards"]])}{f"{endl}• Weekly Orundum Reward Limit : +{ladder['breakFeeAdd']}" if ladder["breakFeeAdd"] > 0 else ""}''' for ladder in first_clear]), inline=False)
+                [f'''**{ladder["killCnt"]}** kills\n{endl.join([f"• {reward['count']} {reward_names[reward['id']]} (`{reward['id']}`)" for reward in ladder["rewards"]])}{f"{endl}• Weekly Orundum Reward Limit : +{ladder['breakFeeAdd']}" if ladder["breakFeeAdd"] > 0 else ""}''' for ladder in first_clear]), inline=False)
             # Sanity Return Rule
             gain_ladder = anni_info["gainLadders"]
             embed.add_field(name="Sanity Return Rule", value="\n".join(
@@ -212,7 +204,7 @@ class General(commands.Cog):
         embed.set_image(
             url=f'https://gamepress.gg/arknights/sites/arknights/files/game-images/mission_maps/{info["stageId"]}.png')
 
-        await ctx.send(embed=embed)
+        return embed
 
     @commands.command(brief="Shows infos of an item", usage="[item]")
     async def item(self, ctx, *, item=None):
@@ -226,7 +218,13 @@ class General(commands.Cog):
             raise GeneralCogError("You need to provide an item name!")
 
         # Get item info
-        info = arknights.get_item(item)
+        info = await async_arknights.get_item(item)
+        await discord_common.send_cached_embed(
+            ctx, arknights.pinned().render_cache, ("item", info["itemId"]),
+            lambda: self.render_item(info))
+
+    async def render_item(self, info):
+        """ Builds the ;item embed """
 
         embed = Embed(
             title=f'{info["name"]} (`{info["itemId"]}`)',
@@ -244,7 +242,7 @@ class General(commands.Cog):
         # Get stages directly
         stages = [
             f'• **[{x["code"]}]** {x["name"]}{" (Challenge Mode)" if x["difficulty"] == "FOUR_STAR" else ""} [{constants.DROP_TYPE[y][1 if info["rarity"] > 1 and y == 2 else 0]}]'
-            for x, y in arknights.get_stage_with_item(
+            for x, y in await async_arknights.get_stage_with_item(
                 info["itemId"]
             )  # Get stage list with item
             if y != 4  # Don't get stage where item is extra drop
@@ -265,7 +263,7 @@ class General(commands.Cog):
         embed.set_thumbnail(
             url=f'https://raw.githubusercontent.com/Aceship/AN-EN-Tags/master/img/items/{info["iconId"]}.png')
 
-        await ctx.send(embed=embed)
+        return embed
 
     @commands.command(brief="Shows infos of a furniture", usage="[furniture]")
     async def furniture(self, ctx, *, furniture=None):
@@ -279,7 +277,14 @@ class General(commands.Cog):
             raise GeneralCogError("You need to provide a furniture name!")
 
         # Get furniture info
-        info = arknights.get_furniture(furniture)
+        info = await async_arknights.get_furniture(furniture)
+        await discord_common.send_cached_embed(
+            ctx, arknights.pinned().render_cache, ("furniture", info["id"]),
+            lambda: self.render_furniture(info))
+
+    async def render_furniture(self, info):
+        """ Builds the ;furniture embed """
+
         embed = Embed(
             title=info["name"],
             description=f'{info["usage"]}\n_{info["description"]}_\n**Rarity** : {"☆" * (info["rarity"] + 1)}\n**How to obtain** : {info["obtainApproach"] or ""}',
@@ -298,7 +303,7 @@ class General(commands.Cog):
         embed.set_thumbnail(
             url=f'https://raw.githubusercontent.com/Aceship/AN-EN-Tags/master/img/furniture/{info["id"]}.png')
 
-        await ctx.send(embed=embed)
+        return embed
 
     @commands.command(brief="Shows infos of an enemy", usage="[enemy]")
     async def enemy(self, ctx, *, enemy=None):
@@ -312,7 +317,13 @@ class General(commands.Cog):
             raise GeneralCogError("You need to provide an enemy name!")
 
         # Get enemy info
-        info = arknights.get_enemy(enemy)
+        info = await async_arknights.get_enemy(enemy)
+        await discord_common.send_cached_embed(
+            ctx, arknights.pinned().render_cache, ("enemy", info["enemyId"]),
+            lambda: self.render_enemy(info))
+
+    async def render_enemy(self, info):
+        """ Builds the ;enemy embed """
 
         description = ""
         # Enemy races: Infected Creature, Sarkaz, etc
@@ -343,7 +354,7 @@ class General(commands.Cog):
         embed.set_thumbnail(
             url=f'https://raw.githubusercontent.com/Aceship/AN-EN-Tags/master/img/enemy/{info["enemyId"]}.png')
 
-        await ctx.send(embed=embed)
+        return embed
 
     @commands.command(
         brief="Shows which operators you can get with which tags",
@@ -352,11 +363,14 @@ class General(commands.Cog):
         """
         Shows which operators you can get with which recruitment tags
         Multi-word tags have to be quoted
+        Add +g to only show the tag combinations that guarantee a 4☆ or higher operator, best first
 
         E.g: ;operator tag Defense Melee "Crowd Control" "Top Operator" "Senior Operator"
         """
 
-        tags = list(tags)
+        # Guarantee mode
+        guarantee = "+g" in tags
+        tags = [x for x in tags if x != "+g"]
         # Check number of tags
         if len(tags) == 0 or len(tags) > 5:
             raise GeneralCogError(
@@ -367,48 +381,65 @@ class General(commands.Cog):
             raise GeneralCogError(
                 f'Tag must be one of {", ".join(constants.TAG_LIST)}')
 
-        # Generate tag combinations
-        tags_combi = [
-            combi
-            for combi_list in [
-                [list(x) for x in combinations(tags, i)] for i in range(1, 4)
-            ]
-            for combi in combi_list
-        ][::-1]
-
-        # Create a match table
-        match_table = [[] for i in range(len(tags_combi))]
-        embed = Embed()
-        # Get operator list
-        operator_list = arknights.get_operator_by_tags(
-            [x.lower() for x in tags])
-
-        for (tag_combi, match_list) in zip(tags_combi, match_table):
-            # Adding operators
-            match_list.extend(
-                [
-                    (operator["name"], operator["rarity"] + 1)
-                    for operator in operator_list
-                    # Check if operator tag list has tag combinations
-                    if (set(tag_combi).issubset(set(operator["tagList"])))
-                    # Only show 6* if "Top Operator" is in query
-                    and not (
-                        "Top Operator" not in tags
-                        and "Top Operator" in operator["tagList"]
-                    )
-                ][::-1]
-            )
-
-            # If match found
-            if len(match_list) > 0:
+        if guarantee:
+            guarantees = await async_arknights.get_recruitment_guarantees(tags)
+            if guarantees is None:
+                raise GeneralCogError("Recruitment data is still being downloaded, please try again later!")
+            embed = Embed()
+            if len(guarantees) == 0:
+                embed.description = "No tag combination guarantees a 4☆ or higher operator"
+            for (tag_combi, rarity, match_list) in guarantees:
                 embed.add_field(
-                    name=" ".join(tag_combi),
+                    name=f'{" ".join(tag_combi)} ({rarity}☆ guaranteed)',
                     value=f'{" ".join([f"`[{op[1]}☆] {op[0]}`" for op in match_list])}',
                     inline=False,
                 )
 
+            await ctx.send(embed=embed)
+            return
+
+        recruitment = await async_arknights.get_recruitment(tags)
+        if recruitment is None:
+            raise GeneralCogError("Recruitment data is still being downloaded, please try again later!")
+
+        embed = Embed()
+        # Every tag combination with the operators it can get, largest combinations first
+        for (tag_combi, match_list) in recruitment:
+            embed.add_field(
+                name=" ".join(tag_combi),
+                value=f'{" ".join([f"`[{op[1]}☆] {op[0]}`" for op in match_list])}',
+                inline=False,
+            )
+
         await ctx.send(embed=embed)
 
+    @commands.command(brief="Shows or changes the game data locale", usage="[locale]")
+    async def locale(self, ctx, data_locale=None):
+        """
+        Shows the game data locale of this server, or changes it (requires the Manage Server permission)
+        Use default to go back to the default locale
+
+        E.g: ;locale ja-JP
+        """
+
+        if data_locale is None:
+            await ctx.send(embed=discord_common.embed_info(
+                f'Game data locale : {arknights.pinned().locale} (available : {", ".join(arknights.current)})'))
+            return
+
+        if not ctx.author.guild_permissions.manage_guild:
+            raise GeneralCogError(
+                "You need the Manage Server permission to change the locale!")
+
+        if data_locale != "default" and data_locale not in arknights.current:
+            raise GeneralCogError(
+                f'Locale must be one of {", ".join(arknights.current)} or default')
+
+        await async_arknights.run(guild_locales.set_locale, ctx.guild.id,
+                                  None if data_locale == "default" else data_locale)
+        await ctx.send(embed=discord_common.embed_info(
+            f'Game data locale set to {data_locale if data_locale != "default" else arknights.locale}'))
+
     @commands.command(brief="Shows some tips", usage="[category]")
     async def tip(self, ctx, *, category=None):
         """
@@ -424,7 +455,7 @@ class General(commands.Cog):
             )
 
         # Get random tip
-        info = arknights.get_tips(category)
+        info = await async_arknights.get_tips(category)
 
         embed = Embed(description=f'**[{info["category"]}]** {info["tip"]}.')
 
@@ -1,3 +1,4 @@
+import functools
 import logging
 import re
 from urllib.request import pathname2url
@@ -5,7 +6,7 @@ from urllib.request import pathname2url
 from discord import Embed
 from discord.ext import commands
 
-from amiya.utils import arknights, discord_common, paginator
+from amiya.utils import arknights, async_arknights, discord_common, guild_locales, paginator
 
 
 class OperatorCogError(commands.CommandError):
@@ -16,6 +17,14 @@ class Operator(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
 
+    async def cog_check(self, ctx):
+        """ Check for game data readiness, and pin the version of the guild locale for the whole command """
+        if not arknights.ready.is_set():
+            raise OperatorCogError("Still warming up, please try again in a few seconds!")
+        arknights.pin(guild_locales.get_locale(
+            ctx.guild.id if ctx.guild is not None else None))
+        return True
+
     @commands.group(invoke_without_command=True)
     async def operator(self, ctx):
         """
@@ -36,7 +45,7 @@ class Operator(commands.Cog):
             raise OperatorCogError("You need to provide an operator name!")
 
         # Get operator info
-        info = arknights.get_operator_info(operator)
+        info = await async_arknights.get_operator_info(operator)
 
         await ctx.send(embed=discord_common.embed_info("Command under construction"))
 
@@ -52,26 +61,32 @@ class Operator(commands.Cog):
             raise OperatorCogError("You need to provide an operator name!")
 
         # Get file
-        info = arknights.get_operator_file(operator)
+        info = await async_arknights.get_operator_file(operator)
 
-        embeds = []
-        for idx, story in enumerate(info[1]["storyTextAudio"]):
-            # Initialize embed and get each file piece
-            endl = "\n"
-            embed = Embed(
-                title=info[0], description=f'''Painter : {info[1]["drawName"]}\nCV : {info[1]["infoName"]}\n\n**{story["storyTitle"]}**\n{endl.join(list(map(lambda x: x["storyText"], story["stories"])))}''')
-
-            # Add image to make the embed less boring with text only
-            # https://github.com/Aceship/AN-EN-Tags/tree/master/img
-            embed.set_thumbnail(
-                url=f'https://raw.githubusercontent.com/Aceship/AN-EN-Tags/master/img/portraits/{pathname2url(info[1]["charID"])}_1.png')
-
-            embeds.append(embed)
+        # One page per story, rendered when first displayed
+        embeds = [functools.partial(self.render_file_page, info, story)
+                  for story in info[1]["storyTextAudio"]]
 
         # Start paginator
         pgnt = paginator.BotEmbedPaginator(ctx, embeds)
         await pgnt.run()
 
+    @staticmethod
+    def render_file_page(info, story):
+        """ Builds a ;operator file page """
+
+        # Initialize embed and get each file piece
+        endl = "\n"
+        embed = Embed(
+            title=info[0], description=f'''Painter : {info[1]["drawName"]}\nCV : {info[1]["infoName"]}\n\n**{story["storyTitle"]}**\n{endl.join(list(map(lambda x: x["storyText"], story["stories"])))}''')
+
+        # Add image to make the embed less boring with text only
+        # https://github.com/Aceship/AN-EN-Tags/tree/master/img
+        embed.set_thumbnail(
+            url=f'https://raw.githubusercontent.com/Aceship/AN-EN-Tags/master/img/portraits/{pathname2url(info[1]["charID"])}_1.png')
+
+        return embed
+
     @operator.command(brief="Shows operator's audio records", usage="[operator]")
     async def audio(self, ctx, *, operator=None):
         """
@@ -84,10 +99,10 @@ class Operator(commands.Cog):
             raise OperatorCogError("You need to provide an operator name!")
 
         # Get audio records
-        info = arknights.get_operator_audio(operator)
+        info = await async_arknights.get_operator_audio(operator)
 
         # Get profile to make the embed less boring
-        profile = arknights.get_operator_file(operator)
+        profile = await async_arknights.get_operator_file(operator)
 
         embeds, lgt = [], len(info[1])
         for i in range(3):
@@ -128,59 +143,64 @@ class Operator(commands.Cog):
             raise OperatorCogError("You need to provide an operator name!")
 
         # Get skin info
-        info = arknights.get_operator_skins(operator)
-
-        embeds = []
-        for skin in info:
-            # Regex for stuffs like <color name=#ffffff>Bla bla bla</color>
-            color = 0x000000
-            content = skin["displaySkin"]["content"]
-            if content is not None:
-                pattern = re.compile(
-                    r"<color name=(#[0-9a-f]{6})>(.*)</color>", re.DOTALL
-                )
-                m = pattern.match(content)
-                if m is not None:
-                    color = int(m.group(1).replace("#", "0x"), 16)
-                    content = m.group(2)
+        info = await async_arknights.get_operator_skins(operator)
 
-            embed = Embed(
-                title=f'{skin["displaySkin"]["skinName"] or skin["displaySkin"]["modelName"]} ({skin["displaySkin"]["skinGroupName"]})',
-                description=(
-                    content or "No description available"),
-                color=color,
-            )
-
-            details = f'• Model : {skin["displaySkin"]["modelName"]}\n• Design : {skin["displaySkin"]["drawerName"]}\n'
-            # Checks are important because some of the value can be None
-            if (
-                skin["displaySkin"]["dialog"] is not None
-                and skin["displaySkin"]["dialog"] not in content
-            ):
-                details += f'• Dialog : {skin["displaySkin"]["dialog"]}\n'
-            if skin["displaySkin"]["usage"] is not None:
-                details += f'• Usage : {skin["displaySkin"]["usage"]}\n'
-            if skin["displaySkin"]["description"] is not None:
-                details += f'• Description : {skin["displaySkin"]["description"]}\n'
-            if skin["displaySkin"]["obtainApproach"] is not None:
-                details += (
-                    f'• How to obtain : {skin["displaySkin"]["obtainApproach"]}\n'
-                )
-            embed.add_field(name="Details", value=details, inline=False)
-
-            # Get item image from
-            # https://github.com/Aceship/AN-EN-Tags/tree/master/img
-            embed.set_image(
-                url=f'https://raw.githubusercontent.com/Aceship/AN-EN-Tags/master/img/characters/{pathname2url(skin["portraitId"])}.png')
-            embed.set_thumbnail(
-                url=f'https://raw.githubusercontent.com/Aceship/AN-EN-Tags/master/img/portraits/{pathname2url(skin["portraitId"].replace("+", "a").replace("#", "b" if skin["displaySkin"]["modelName"] == "Amiya" else ""))}.png')
-
-            embeds.append(embed)
+        # One page per skin, rendered when first displayed
+        embeds = [functools.partial(self.render_skin_page, skin) for skin in info]
 
         # Start paginator
         pgnt = paginator.BotEmbedPaginator(ctx, embeds)
         await pgnt.run()
 
+    @staticmethod
+    def render_skin_page(skin):
+        """ Builds a ;operator skins page """
+
+        # Regex for stuffs like <color name=#ffffff>Bla bla bla</color>
+        color = 0x000000
+        content = skin["displaySkin"]["content"]
+        if content is not None:
+            pattern = re.compile(
+                r"<color name=(#[0-9a-f]{6})>(.*)</color>", re.DOTALL
+            )
+            m = pattern.match(content)
+            if m is not None:
+                color = int(m.group(1).replace("#", "0x"), 16)
+                content = m.group(2)
+
+        embed = Embed(
+            title=f'{skin["displaySkin"]["skinName"] or skin["displaySkin"]["modelName"]} ({skin["displaySkin"]["skinGroupName"]})',
+            description=(
+                content or "No description available"),
+            color=color,
+        )
+
+        details = f'• Model : {skin["displaySkin"]["modelName"]}\n• Design : {skin["displaySkin"]["drawerName"]}\n'
+        # Checks are important because some of the value can be None
+        if (
+            skin["displaySkin"]["dialog"] is not None
+            and skin["displaySkin"]["dialog"] not in content
+        ):
+            details += f'• Dialog : {skin["displaySkin"]["dialog"]}\n'
+        if skin["displaySkin"]["usage"] is not None:
+            details += f'• Usage : {skin["displaySkin"]["usage"]}\n'
+        if skin["displaySkin"]["description"] is not None:
+            details += f'• Description : {skin["displaySkin"]["description"]}\n'
+        if skin["displaySkin"]["obtainApproach"] is not None:
+            details += (
+                f'• How to obtain : {skin["displaySkin"]["obtainApproach"]}\n'
+            )
+        embed.add_field(name="Details", value=details, inline=False)
+
+        # Get item image from
+        # https://github.com/Aceship/AN-EN-Tags/tree/master/img
+        embed.set_image(
+            url=f'https://raw.githubusercontent.com/Aceship/AN-EN-Tags/master/img/characters/{pathname2url(skin["portraitId"])}.png')
+        embed.set_thumbnail(
+            url=f'https://raw.githubusercontent.com/Aceship/AN-EN-Tags/master/img/portraits/{pathname2url(skin["portraitId"].replace("+", "a").replace("#", "b" if skin["displaySkin"]["modelName"] == "Amiya" else ""))}.png')
+
+        return embed
+
     @operator.command(brief="Shows operator's skills info", usage="[operator]")
     async def skills(self, ctx, *, operator=None):
         """
@@ -193,7 +213,7 @@ class Operator(commands.Cog):
             raise OperatorCogError("You need to provide an operator name!")
 
         # Get skills list
-        info = arknights.get_operator_skills(operator)
+        info = await async_arknights.get_operator_skills(operator)
 
         await ctx.send(embed=discord_common.embed_info("Command under construction"))
 
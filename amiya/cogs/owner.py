@@ -0,0 +1,151 @@
+import copy
+import io
+import logging
+import time
+
+import discord
+from discord.ext import commands
+
+from amiya.utils import arknights, async_arknights, discord_common, metrics, profiling
+
+
+class OwnerCogError(commands.CommandError):
+    pass
+
+
+class Owner(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+
+    async def cog_check(self, ctx):
+        """ Check for bot owner """
+        if not await self.bot.is_owner(ctx.author):
+            raise commands.NotOwner("You do not own this bot.")
+        return True
+
+    @commands.command(brief="Reloads the game data", usage="")
+    async def reload(self, ctx):
+        """
+        Loads the game data again from ArknightsData and swaps it in without restarting
+        Commands that are already running finish with the previous data
+        """
+
+        previous = arknights.pinned().version
+        await ctx.send(embed=discord_common.embed_info(f"Reloading game data (version {previous})..."))
+
+        start = time.perf_counter()
+        try:
+            game_data = await async_arknights.reload()
+        except Exception as error:
+            logging.exception(error)
+            raise OwnerCogError(
+                f"Reload failed, still serving version {previous}: {error}")
+
+        await ctx.send(embed=discord_common.embed_info(
+            f"Game data reloaded to version {game_data.version} in {time.perf_counter() - start:.1f} s"))
+
+    @commands.command(brief="Shows the memory cost of every locale", usage="")
+    async def memory(self, ctx):
+        """
+        Measures the game data of every locale, parts shared between locales are only counted once in "added"
+        """
+
+        report = await self.bot.loop.run_in_executor(None, arknights.memory_report)
+
+        lines = [
+            f'**{name}** : {x["standalone"] / 2 ** 20:.1f} MiB alone, +{x["added"] / 2 ** 20:.1f} MiB added, {x["mapped"] / 2 ** 20:.1f} MiB mapped'
+            for name, x in report.items()]
+        lines.append(
+            f'**Total** : {sum(x["added"] for x in report.values()) / 2 ** 20:.1f} MiB instead of {sum(x["standalone"] for x in report.values()) / 2 ** 20:.1f} MiB loaded separately')
+        await ctx.send(embed=discord_common.embed_info("\n".join(lines)))
+
+    @commands.command(brief="Shows the cache hit rates", usage="")
+    async def caches(self, ctx):
+        """
+        Counters of the query caches of every resolver and of the render cache, for the current version of every locale
+        """
+
+        lines = []
+        for name, game_data in arknights.current.items():
+            lines.append(f"**{name}** (version {game_data.version})")
+            lines.extend(
+                f'• {cache} : {x["hit_rate"]:.0%} of {x["hits"] + x["misses"]} hits, {x["size"]}/{x["maxsize"]} entries, {x["evictions"]} evictions'
+                + (f', {x["weight"] / 2 ** 20:.1f}/{x["maxweight"] / 2 ** 20:.1f} MiB' if x["maxweight"] is not None else "")
+                for cache, x in game_data.cache_stats().items())
+        await ctx.send(embed=discord_common.embed_info("\n".join(lines)))
+
+    @commands.command(brief="Shows command latencies and errors", usage="")
+    async def metrics(self, ctx):
+        """
+        Median time of every command until it responds, split between data lookups, rendering and Discord sends,
+        and errors per cog since the bot started
+        """
+
+        lines = []
+        for command in metrics.commands():
+            x = metrics.summary(command)
+            lines.append(
+                f'**{command}** : {x["count"]} runs, {x["total"] * 1000:.0f} ms (lookup {x["lookup"] * 1000:.0f}, render {x["render"] * 1000:.0f}, send {x["send"] * 1000:.0f}), p95 {x["p95"] * 1000:.0f} ms')
+        for (cog, error), count in sorted(metrics.errors.items()):
+            lines.append(f"**{cog or 'No cog'}** : {count} {error}")
+
+        await ctx.send(embed=discord_common.embed_info("\n".join(lines) or "No command ran yet"))
+
+    @commands.command(brief="Profiles a command", usage="[+cold] [command]")
+    async def profile(self, ctx, *, command_line=None):
+        """
+        Runs a command under the profiler, then sends the time spent in data lookups, fuzzy matching, JSON loading
+        and embed building, with the slowest functions
+        Use +cold to clear the query, level and render caches first
+        The raw profile is also saved in PROFILE_DIR when set
+
+        E.g: ;profile +cold stage H5-4
+        """
+
+        if command_line is None:
+            raise OwnerCogError("You need to provide a command to profile!")
+
+        cold = command_line.startswith("+cold ")
+        if cold:
+            command_line = command_line[len("+cold "):].strip()
+
+        # Same message, with the command to profile
+        message = copy.copy(ctx.message)
+        message.content = f"{ctx.prefix}{command_line}"
+        profiled_ctx = await self.bot.get_context(message)
+        if profiled_ctx.command is None:
+            raise OwnerCogError(f"Unknown command : {command_line}")
+
+        if cold:
+            for game_data in arknights.current.values():
+                for cache in game_data.query_caches.values():
+                    cache.clear()
+                game_data.level_cache.clear()
+                game_data.render_cache.clear()
+
+        try:
+            session = await profiling.profile(lambda: self.bot.invoke(profiled_ctx))
+        except RuntimeError as error:
+            raise OwnerCogError(str(error))
+
+        report = await self.bot.loop.run_in_executor(
+            None, profiling.report, session, f"{ctx.prefix}{command_line}{' (cold)' if cold else ''}")
+        path = await self.bot.loop.run_in_executor(
+            None, profiling.save, session, f"{profiled_ctx.command.qualified_name.replace(' ', '_')}-{int(time.time())}")
+
+        categories = profiling.categorize(session.stats())
+        lines = [f"**{command_line}** : {session.elapsed * 1000:.0f} ms"]
+        lines.extend(f"• {category[0].upper()}{category[1:]} : {seconds * 1000:.1f} ms" for category, seconds in categories.items())
+        if path is not None:
+            lines.append(f"Saved to `{path}`")
+        await ctx.send(embed=discord_common.embed_info("\n".join(lines)),
+                       file=discord.File(io.BytesIO(report.encode("utf-8")), filename="profile.txt"))
+
+    @discord_common.send_error_if(OwnerCogError)
+    async def cog_command_error(self, ctx, error):
+        logging.exception(error)
+        pass
+
+
+def setup(bot):
+    bot.add_cog(Owner(bot))
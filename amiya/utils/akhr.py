@@ -0,0 +1,195 @@
+"""
+Aceship's akhr.json, which tells which operators can be obtained from recruitment
+Fetched through the shared HTTP client with a timeout and kept in a disk cache that is revalidated (ETag / Last-Modified) once older than its TTL
+The cache is served right away at startup while a background task keeps it fresh
+Set AKHR_URL to fetch from another server (e.g. a local one when testing)
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Optional
+
+import aiohttp
+
+from amiya.utils import arknights, http_client
+
+URL = os.getenv(
+    "AKHR_URL", "https://raw.githubusercontent.com/Aceship/AN-EN-Tags/master/json/akhr.json")
+CACHE_PATH = Path(os.getenv("AKHR_CACHE", ".cache/akhr.json"))
+# Seconds before the cache is revalidated
+TTL = float(os.getenv("AKHR_TTL", 6 * 3600))
+# Seconds before a fetch (retries included) is given up
+TIMEOUT = float(os.getenv("AKHR_TIMEOUT", 10))
+# Seconds before a failed fetch is retried
+RETRY_DELAY = float(os.getenv("AKHR_RETRY_DELAY", 300))
+
+# When the served data was last fetched or revalidated
+fetched_at = None
+
+
+def read_cache(path: Path = CACHE_PATH) -> Optional[dict]:
+    """
+    Reads the disk cache
+
+    Args:
+        path (Path, optional): Cache file. Defaults to CACHE_PATH.
+
+    Returns:
+        Optional[dict]: A dict with the data, when it was fetched and its validators (etag, last_modified), None if missing or unreadable
+    """
+
+    if not path.exists():
+        return None
+
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        logging.warning(f"Ignoring unreadable akhr cache {path}")
+        return None
+
+
+def write_cache(entry: dict, path: Path = CACHE_PATH) -> None:
+    """
+    Writes the disk cache
+
+    Args:
+        entry (dict): The cache entry
+        path (Path, optional): Cache file. Defaults to CACHE_PATH.
+    """
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    # Write then rename so that a crash never leaves a partial cache
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(entry, f)
+    os.replace(tmp, path)
+
+
+def load(path: Path = CACHE_PATH) -> bool:
+    """
+    Serves the cached data, even if stale, until it is refreshed
+
+    Args:
+        path (Path, optional): Cache file. Defaults to CACHE_PATH.
+
+    Returns:
+        bool: Whether a cache was found
+    """
+
+    global fetched_at
+    entry = read_cache(path)
+    if entry is None:
+        return False
+
+    fetched_at = entry["fetched_at"]
+    arknights.set_hidden_table(entry["data"])
+    logging.info(
+        f"Loaded akhr.json from cache ({(time.time() - entry['fetched_at']) / 3600:.1f} h old)")
+    return True
+
+
+async def fetch(url: str, entry: Optional[dict]) -> dict:
+    """
+    Fetches the data, only downloading it if it changed since the cached entry
+
+    Args:
+        url (str): akhr.json url
+        entry (Optional[dict]): The cached entry to revalidate, None to download
+
+    Raises:
+        aiohttp.ClientError: If the request failed
+        asyncio.TimeoutError: If the request timed out
+        ValueError: If the response isn't valid JSON
+
+    Returns:
+        dict: The new cache entry
+    """
+
+    # Conditional request
+    headers = {}
+    if entry is not None and entry.get("etag"):
+        headers["If-None-Match"] = entry["etag"]
+    if entry is not None and entry.get("last_modified"):
+        headers["If-Modified-Since"] = entry["last_modified"]
+
+    # The request itself stops at the timeout, retries included
+    response = await http_client.client.get(url, headers, TIMEOUT)
+
+    # Still valid
+    if response.status == 304 and entry is not None:
+        return dict(entry, fetched_at=time.time())
+
+    response.raise_for_status()
+    return {
+        "fetched_at": time.time(),
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+        "data": response.json(),
+    }
+
+
+async def refresh(force: bool = False, url: str = URL, path: Path = CACHE_PATH) -> bool:
+    """
+    Revalidates the cache if it expired and serves the new data
+
+    Args:
+        force (bool, optional): Revalidate even if the cache hasn't expired. Defaults to False.
+        url (str, optional): akhr.json url. Defaults to URL.
+        path (Path, optional): Cache file. Defaults to CACHE_PATH.
+
+    Returns:
+        bool: Whether fresh data is served, the previous data is kept otherwise
+    """
+
+    global fetched_at
+    loop = asyncio.get_event_loop()
+    entry = await loop.run_in_executor(None, read_cache, path)
+
+    if entry is not None and not force and time.time() - entry["fetched_at"] < TTL:
+        if arknights.hidden_table is None:
+            arknights.set_hidden_table(entry["data"])
+        fetched_at = entry["fetched_at"]
+        return True
+
+    try:
+        new_entry = await fetch(url, entry)
+    except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as error:
+        logging.warning(f"Fetching akhr.json failed: {error!r}")
+        return False
+
+    await loop.run_in_executor(None, write_cache, new_entry, path)
+    fetched_at = new_entry["fetched_at"]
+
+    # Only rebuild the recruitment data if it changed
+    if entry is None or new_entry["data"] is not entry["data"] or arknights.hidden_table is None:
+        arknights.set_hidden_table(new_entry["data"])
+        logging.info("Fetched akhr.json")
+    else:
+        logging.info("akhr.json is up to date")
+
+    return True
+
+
+async def refresh_loop(url: str = URL, path: Path = CACHE_PATH) -> None:
+    """
+    Keeps the cache fresh, meant to run as a background task
+
+    Args:
+        url (str, optional): akhr.json url. Defaults to URL.
+        path (Path, optional): Cache file. Defaults to CACHE_PATH.
+    """
+
+    while True:
+        if await refresh(url=url, path=path):
+            # Until the cache expires
+            delay = TTL - (time.time() - fetched_at)
+        else:
+            delay = RETRY_DELAY
+
+        await asyncio.sleep(max(delay, 1))
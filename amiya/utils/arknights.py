@@ -1,474 +1,998 @@
 """
 Arknights data parsing
-Return logic for every function: Get the value with highest Levenshtein Distance between input and name, ID (or code, appellation)
+Return logic for every function: Return the value whose ID matches the input exactly, otherwise get the value with highest Levenshtein Distance between input and name, ID (or code, appellation)
+Fuzzy matching only scores the candidates of a trigram index built once per table (see amiya.utils.search)
+IDs resolved from fuzzy queries are cached per resolver until the data is reloaded
+Tables and indexes are loaded lazily at most once each, or all together by warm_up()
+All of them belong to a GameData version, reload() loads a new version in the background and swaps it in at once
+They are read from binary snapshots when valid ones exist (see amiya.utils.snapshot), otherwise from JSON
+The largest tables are served record by record from memory-mapped stores when their snapshot exists
 """
 
 import json
 import logging
+import os
 import random
-from typing import List, Optional, Tuple
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from typing import Any, Callable, List, Mapping, Optional, Tuple
+
+from amiya.utils import constants, snapshot
+from amiya.utils.cache import LRUCache
+from amiya.utils.dedup import Interner, deep_size
+from amiya.utils.recordstore import RecordStore, group_records
+from amiya.utils.recruitment import RecruitmentEngine
+from amiya.utils.search import FuzzyIndex, normalize
+
+# Default data locale, guilds can choose another one of LOCALES
+locale = os.getenv("LOCALE", "en-US")
+# akhr.json and the recruitment tags are in English
+RECRUITMENT_LOCALE = "en-US"
+# Locales served, from ArknightsData/<locale>
+LOCALES = list(dict.fromkeys(
+    [locale, RECRUITMENT_LOCALE, *filter(None, os.getenv("LOCALES", "").split(","))]))
+
+# Excel tables loaded from ArknightsData/<locale>/gamedata/excel
+TABLES = [
+    "character_table",
+    "handbook_info_table",
+    "charword_table",
+    "skin_table",
+    "skill_table",
+    "item_table",
+    "stage_table",
+    "building_data",
+    "enemy_handbook_table",
+    "tip_table",
+    "gamedata_const",
+]
+
+# Fuzzy search indexes, mapped to (source table, builder taking the table)
+INDEXES = {
+    # Match ID, name or appellation
+    "operator": ("character_table", lambda table: FuzzyIndex(
+        (key, (key, x["name"], x["appellation"])) for key, x in table.items())),
+    # Match name or ID
+    "item": ("item_table", lambda table: FuzzyIndex(
+        (key, (x["name"], x["itemId"])) for key, x in table["items"].items())),
+    # Match ID, code or name
+    "stage": ("stage_table", lambda table: FuzzyIndex(
+        (key, (x["stageId"], x["code"], x["name"])) for key, x in table["stages"].items())),
+    # Match name or ID
+    "furniture": ("building_data", lambda table: FuzzyIndex(
+        (key, (x["name"], x["id"])) for key, x in table["customData"]["furnitures"].items())),
+    # Match name or ID
+    "enemy": ("enemy_handbook_table", lambda table: FuzzyIndex(
+        (key, (x["name"], x["enemyId"])) for key, x in table.items())),
+    # Item ID -> stages dropping it
+    "drops": ("stage_table", lambda table: drop_index(table["stages"])),
+}
+
+# Indexes used to resolve fuzzy queries
+RESOLVERS = ["operator", "item", "stage", "furniture", "enemy"]
+
+# Records resolved by get_rewards, mapped to the function grabbing them by ID (fuzzy IDs use the index of the same name)
+REWARD_RECORDS = {
+    "item": lambda game_data: game_data.load_table("item_table")["items"],
+    "operator": lambda game_data: game_data.load_table("character_table"),
+    "furniture": lambda game_data: game_data.load_table("building_data")["customData"]["furnitures"],
+    "enemy": lambda game_data: game_data.load_table("enemy_handbook_table"),
+}
+# Reward types that aren't items, mapped to their records (one of REWARD_RECORDS)
+REWARD_TYPES = {"TKT_RECRUIT": "operator", "FURN": "furniture", "ENEMY": "enemy"}
+
+# Records of large tables whose commands only need a few of them, mapped to (source table,
+# function extracting the records from the table, record field grouping them, record field sorting each group)
+RECORD_STORES = {
+    "voices": ("charword_table", lambda table: table, "charId", "voiceIndex"),
+    "handbooks": ("handbook_info_table", lambda table: table["handbookDict"], None, None),
+    "skins": ("skin_table", lambda table: table["charSkins"], "charId", None),
+    "stages": ("stage_table", lambda table: table["stages"], None, None),
+    "campaigns": ("stage_table", lambda table: table["campaigns"], None, None),
+}
+
+# Set once the data can be served, either after warm_up() or right away when loading lazily
+ready = threading.Event()
+
+
+def table_path(name: str, data_locale: str = None) -> str:
+    """ Path of an excel table file, in the current locale by default """
+    return f"ArknightsData/{data_locale or locale}/gamedata/excel/{name}.json"
+
+
+def read_json(path: str, object_pairs_hook: Callable = None) -> dict:
+    """ Parses a JSON file """
+    with open(path, "r", encoding="UTF-8") as f:
+        return json.load(f, object_pairs_hook=object_pairs_hook)
+
+
+class GameData:
+    """
+    One version of the game data of a locale
+    Its tables, indexes, record stores and caches are all loaded from the same files, so that commands keep
+    a consistent view while reload() swaps a newer version in
+    """
+
+    def __init__(self, data_locale: str, version: int = 1, interner: Optional[Interner] = None):
+        """
+        Args:
+            data_locale (str): Data locale
+            version (int, optional): Version number. Defaults to 1.
+            interner (Optional[Interner], optional): Pool sharing identical table parts with other locales. Defaults to None.
+        """
+
+        self.locale = data_locale
+        self.version = version
+        self.interner = interner
+
+        self.tables = {}
+        self.indexes = {}
+        self.stores = {}
+        # Secondary indexes (group -> records) of grouped records without a record store
+        self.groups = {}
+        # One lock per table, index and store so that racing commands load them only once
+        self._locks = {name: threading.Lock()
+                       for name in [*TABLES, *INDEXES, *RECORD_STORES]}
+        self._group_locks = {name: threading.Lock() for name in RECORD_STORES}
+
+        # Normalized query -> resolved ID, one cache per resolver
+        self.query_caches = {
+            name: LRUCache(int(os.getenv("QUERY_CACHE_SIZE", 1024)))
+            for name in RESOLVERS
+        }
+
+        # Level ID -> level summary
+        self.level_cache = LRUCache(int(os.getenv("LEVEL_CACHE_SIZE", 256)))
+
+        # (command, resolved ID, flags) -> rendered embed payload, bounded by the size of the serialized payloads
+        # Rendering only depends on this version, so stale embeds are dropped along with it
+        self.render_cache = LRUCache(
+            int(os.getenv("RENDER_CACHE_SIZE", 1024)),
+            int(os.getenv("RENDER_CACHE_BYTES", 4 * 2 ** 20)),
+            lambda payload: len(json.dumps(payload)))
+
+        # Game constants named following PEP8, see load_constants()
+        self.constants = None
+
+        # Recruitment engine, with the akhr.json it was built from
+        self.recruitment = (None, None)
+        self._recruitment_lock = threading.Lock()
+
+    def load_table(self, name: str) -> dict:
+        """
+        Grabs an excel table, loading it from its snapshot or local file the first time
+
+        Args:
+            name (str): Table name (one of TABLES)
+
+        Returns:
+            dict: The parsed table
+        """
+
+        if name not in self.tables:
+            with self._locks[name]:
+                # Another thread may have loaded it while we were waiting
+                if name not in self.tables:
+                    path = table_path(name, self.locale)
+                    start = time.perf_counter()
+                    table = snapshot.load(name, self.locale, [path])
+                    source = "snapshot"
+                    if table is None:
+                        # Shared while parsing, so that duplicates never pile up
+                        table = read_json(
+                            path, self.interner.pairs_hook if self.interner is not None else None)
+                        source = "JSON"
+                    elif self.interner is not None:
+                        table = self.interner.share(table)
+                    self.tables[name] = table
+                    logging.info(
+                        f"Loaded {name} ({os.path.getsize(path) / 1024:.0f} KiB) from {source} in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+        return self.tables[name]
+
+    def load_store(self, name: str) -> Optional[RecordStore]:
+        """
+        Grabs a memory-mapped record store, opening it the first time
+
+        Args:
+            name (str): Store name (one of RECORD_STORES)
+
+        Returns:
+            Optional[RecordStore]: The store, None if there is no valid snapshot
+        """
 
-import requests
-# Fuzzy String Matching
-from fuzzywuzzy.fuzz import ratio
+        if name not in self.stores:
+            with self._locks[name]:
+                if name not in self.stores:
+                    self.stores[name] = snapshot.load_records(
+                        name, self.locale, [table_path(RECORD_STORES[name][0], self.locale)])
+                    if self.stores[name] is not None:
+                        logging.info(
+                            f"Mapped {name} ({len(self.stores[name])} records)")
 
-from amiya.utils import constants
+        return self.stores[name]
 
-locale = 'en-US'
+    def load_records(self, name: str) -> Mapping[str, dict]:
+        """
+        Grabs the records of a large table, from its record store or else from the loaded table
+
+        Args:
+            name (str): Store name (one of RECORD_STORES)
+
+        Returns:
+            Mapping[str, dict]: A mapping of key -> record
+        """
+
+        store = self.load_store(name)
+        if store is not None:
+            return store
+
+        table_name, records, _, _ = RECORD_STORES[name]
+        return records(self.load_table(table_name))
+
+    def load_groups(self, name: str) -> dict:
+        """
+        Grabs the secondary index of grouped records, building it the first time
+
+        Args:
+            name (str): Store name (one of RECORD_STORES with a group field)
+
+        Returns:
+            dict: A dict that maps each group to its records, in group order
+        """
+
+        if name not in self.groups:
+            with self._group_locks[name]:
+                if name not in self.groups:
+                    table_name, records, group_by, sort_by = RECORD_STORES[name]
+                    self.groups[name] = {
+                        key: [record for _, record in pairs]
+                        for key, pairs in group_records(records(self.load_table(table_name)).items(), group_by, sort_by).items()
+                    }
+
+        return self.groups[name]
+
+    def load_group(self, name: str, group: str) -> List[dict]:
+        """
+        Grabs the grouped records that belong to a group (e.g. voice lines or skins of a charId)
 
+        Args:
+            name (str): Store name (one of RECORD_STORES with a group field)
+            group (str): Group name
 
-def fetch(url: str) -> dict:
+        Returns:
+            List[dict]: The records, in group order
+        """
+
+        store = self.load_store(name)
+        if store is not None:
+            return store.group(group)
+
+        # Copy so that callers can't alter the index
+        return list(self.load_groups(name).get(group, []))
+
+    def load_index(self, name: str) -> Any:
+        """
+        Grabs an index, loading it from its snapshot or building it the first time
+
+        Args:
+            name (str): Index name (one of INDEXES)
+
+        Returns:
+            Any: The index
+        """
+
+        if name not in self.indexes:
+            with self._locks[name]:
+                if name not in self.indexes:
+                    table_name, builder = INDEXES[name]
+                    start = time.perf_counter()
+                    index = snapshot.load(
+                        f"{name}_index", self.locale, [table_path(table_name, self.locale)])
+                    if index is None:
+                        index = builder(self.load_table(table_name))
+                    self.indexes[name] = index
+                    logging.info(
+                        f"Loaded {name} index ({len(index)} entries) in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+        return self.indexes[name]
+
+    def load_constants(self) -> dict:
+        """
+        Grabs the game constants of this locale (gamedata_const), named following PEP8
+
+        Returns:
+            dict: A dict that maps constant name (e.g. MAX_PLAYER_LEVEL) to its value
+        """
+
+        if self.constants is None:
+            self.constants = constants.convert(self.load_table("gamedata_const"))
+        return self.constants
+
+    def load_recruitment(self) -> Optional[RecruitmentEngine]:
+        """
+        Builds the recruitment tag engine once per akhr.json
+
+        Returns:
+            Optional[RecruitmentEngine]: The engine, None until akhr.json has been fetched
+        """
+
+        # Matched against English names and tags
+        if self.locale != RECRUITMENT_LOCALE:
+            return current[RECRUITMENT_LOCALE].load_recruitment()
+
+        table = hidden_table
+        if table is not None and self.recruitment[0] is not table:
+            with self._recruitment_lock:
+                if self.recruitment[0] is not table:
+                    self.recruitment = (table, RecruitmentEngine(
+                        self.load_table("character_table"), table))
+
+        return self.recruitment[1]
+
+    def warm_up(self) -> None:
+        """
+        Loads every table then builds every index concurrently
+        """
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=len(TABLES), thread_name_prefix="warm-up") as pool:
+            # Consume the results so that loading errors are raised
+            list(pool.map(self.load_store, RECORD_STORES))
+
+            # Tables whose records are all mapped don't need to be loaded
+            unmapped = {table for name, (table, *_) in RECORD_STORES.items()
+                        if self.stores[name] is None}
+            mapped = {table for table, *_ in RECORD_STORES.values()} - unmapped
+            list(pool.map(self.load_table, [
+                 name for name in TABLES if name not in mapped]))
+
+            list(pool.map(self.load_groups, [
+                 name for name, (_, _, group_by, _) in RECORD_STORES.items() if group_by is not None and self.stores[name] is None]))
+            list(pool.map(self.load_index, INDEXES))
+
+        logging.info(
+            f"Data version {self.version} ({self.locale}) warmed up in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    def resolve(self, name: str, query: str) -> str:
+        """
+        Grabs the ID of the entry that matches the query best, using the resolver's query cache
+
+        Args:
+            name (str): Resolver name (one of RESOLVERS)
+            query (str): The search query
+
+        Returns:
+            str: The resolved ID
+        """
+
+        query = normalize(query)
+        cache = self.query_caches[name]
+
+        key = cache.get(query)
+        if key is None:
+            key = self.load_index(name).search(query)
+            cache.put(query, key)
+
+        return key
+
+    def cache_stats(self) -> dict:
+        """
+        Grabs the query cache counters of every resolver and the render cache counters
+
+        Returns:
+            dict: A dict that maps resolver name (or "render") to its size, maxsize, weight, maxweight, hits, misses, evictions and hit rate
+        """
+
+        return {**{name: cache.stats() for name, cache in self.query_caches.items()}, "render": self.render_cache.stats()}
+
+    def memory(self, seen: Optional[set] = None) -> dict:
+        """
+        Measures the loaded tables, indexes and secondary indexes
+
+        Args:
+            seen (Optional[set], optional): Ids of objects already counted (e.g. for other locales), updated with the measured ones. Defaults to None.
+
+        Returns:
+            dict: A dict with the size in bytes of objects that weren't seen before ("heap") and of the mapped record stores ("mapped")
+        """
+
+        return {
+            "heap": deep_size([self.tables, self.indexes, self.groups], set() if seen is None else seen),
+            "mapped": sum(os.path.getsize(snapshot.records_path(name, self.locale))
+                          for name, store in self.stores.items() if store is not None),
+        }
+
+
+# Aceship's akhr.json, served by amiya.utils.akhr
+hidden_table = None
+
+# Locale -> the version commands are served from, only ever replaced as a whole by reload()
+# Identical parts of the tables of every locale are shared (see amiya.utils.dedup) unless SHARE_LOCALES=false
+share_locales = len(LOCALES) > 1 and os.getenv(
+    "SHARE_LOCALES", "true").lower() in ("1", "true", "yes")
+# One pool for every locale, kept when loading lazily as tables keep being loaded
+_interner = Interner() if share_locales else None
+current = {name: GameData(name, interner=_interner) for name in LOCALES}
+_reload_lock = threading.Lock()
+# Version pinned by the running command, see pin()
+_pinned = ContextVar("game_data", default=None)
+
+
+def pin(data_locale: Optional[str] = None) -> GameData:
+    """
+    Pins the current version of a locale for the rest of the running task (e.g. a command), so that all its lookups
+    use the same version even if a reload swaps a newer one in meanwhile
+
+    Args:
+        data_locale (Optional[str], optional): Data locale, the default one if None or not served. Defaults to None.
+
+    Returns:
+        GameData: The pinned version
+    """
+
+    game_data = current.get(data_locale) or current[locale]
+    _pinned.set(game_data)
+    return game_data
+
+
+def pinned() -> GameData:
+    """ The version pinned by the running task, the current one of the default locale otherwise """
+    return _pinned.get() or current[locale]
+
+
+def warm_up_all(game_datas: List[GameData]) -> None:
     """
-    Grabs json data from Github link
+    Loads every locale concurrently, then drops their shared pool as lookups don't need it
 
     Args:
-        url (str): Github raw file url
+        game_datas (List[GameData]): A version of every locale
+    """
+
+    with ThreadPoolExecutor(max_workers=len(game_datas), thread_name_prefix="locale") as pool:
+        list(pool.map(GameData.warm_up, game_datas))
+
+    interner = game_datas[0].interner
+    if interner is not None:
+        logging.info(
+            f"Shared {interner.hits} identical values between {', '.join(x.locale for x in game_datas)}")
+        interner.clear()
+        for game_data in game_datas:
+            game_data.interner = None
+
+
+def warm_up() -> None:
+    """
+    Loads every table then builds every index of every locale concurrently, and sets `ready`
+    """
+
+    warm_up_all(list(current.values()))
+    ready.set()
+
+
+def reload(build_snapshots: bool = True) -> GameData:
+    """
+    Loads a new version of the game data of every locale from ArknightsData and swaps it in once everything is loaded
+    Commands that already pinned the previous version keep using it
+
+    Args:
+        build_snapshots (bool, optional): Recompile the snapshots first when they are used, so that restarts stay fast. Defaults to True.
 
     Returns:
-        dict: A json that contains the results
+        GameData: The new version of the default locale
     """
 
-    # Using requests to fetch data
-    data = requests.get(url)
+    global current
+    # One reload at a time
+    with _reload_lock:
+        start = time.perf_counter()
+        for name in current:
+            if build_snapshots and (snapshot.SNAPSHOT_DIR / name).is_dir():
+                snapshot.build(name)
+
+        interner = Interner() if share_locales else None
+        version = current[locale].version + 1
+        game_datas = {name: GameData(name, version, interner)
+                      for name in current}
+        warm_up_all(list(game_datas.values()))
+
+        # A single assignment, so that lookups see either version as a whole
+        current = game_datas
+        constants.setup()
+        logging.info(
+            f"Reloaded game data to version {version} in {time.perf_counter() - start:.1f} s")
+
+    return current[locale]
+
 
-    # If an error occurred during fetching
-    if data.status_code != 200:
-        logging.error("Fetching failed")
-        return None
+def memory_report() -> dict:
+    """
+    Measures the memory cost of every locale
 
-    # Parses data to json (dict)
-    data = data.json()
-    return data
+    Returns:
+        dict: A dict that maps locale to the size in bytes of its data alone ("standalone"), of what it adds to the locales
+              before it ("added", shared parts are only counted once) and of its mapped record stores ("mapped")
+    """
 
+    report = {}
+    seen = set()
+    for name, game_data in current.items():
+        standalone = game_data.memory()
+        report[name] = {
+            "standalone": standalone["heap"],
+            "added": game_data.memory(seen)["heap"],
+            "mapped": standalone["mapped"],
+        }
 
-operator_table = None
+    return report
 
 
-def get_operator_info(operator: str) -> dict:
+def set_hidden_table(table: List[dict]) -> None:
+    """
+    Serves a new akhr.json, recruitment engines are rebuilt on next use
+
+    Args:
+        table (List[dict]): Aceship's akhr list of operators with their "hidden" flag
+    """
+
+    global hidden_table
+    hidden_table = table
+
+
+def cache_stats() -> dict:
+    """
+    Grabs the query and render cache counters of the current version of the default locale
+
+    Returns:
+        dict: A dict that maps resolver name (or "render") to its size, maxsize, weight, maxweight, hits, misses, evictions and hit rate
+    """
+
+    return current[locale].cache_stats()
+
+
+def drop_index(stages: dict) -> dict:
+    """
+    Inverts the drop lists of every stage (including challenge mode and annihilation stages)
+
+    Args:
+        stages (dict): Stages mapped by stage ID
+
+    Returns:
+        dict: A dict that maps item ID to a list of tuple (stage ID, drop type), in table order
+    """
+
+    drops = {}
+    for stage_id, stage in stages.items():
+        seen = set()
+        for reward in stage["stageDropInfo"]["displayDetailRewards"]:
+            # Only the first listing of an item counts, as displayed in game
+            if reward["id"] not in seen:
+                seen.add(reward["id"])
+                drops.setdefault(reward["id"], []).append(
+                    (stage_id, reward["dropType"]))
+
+    return drops
+
+
+def get_operator_info(operator: str, game_data: GameData = None) -> dict:
     """
     Grabs operator detailed info (search by name, ID or appellation)
 
     Args:
         operator (str): Operator name, ID or appellation
+        game_data (GameData, optional): Game data version, the one pinned by the running command by default. Defaults to None.
 
     Returns:
         dict: A json that contains the operator info with ID, name or appellation that matches the parameter
     """
 
-    global operator_table
-    # Check if operator_table is already loaded and load it from local file
-    if operator_table is None:
-        with open(f"ArknightsData/{locale}/gamedata/excel/character_table.json", "r", encoding="UTF-8") as f:
-            operator_table = json.load(f)
-
-    return max(
-        list(operator_table.items()),
-        key=lambda x: max(
-            # Match ID
-            ratio(x[0], operator),
-            # Match name
-            ratio(x[1]["name"], operator),
-            # Match appellation
-            ratio(x[1]["appellation"] or "", operator),
-        ),
-    )
+    game_data = game_data or pinned()
+
+    operator_table = game_data.load_table("character_table")
 
+    # Tables are keyed by ID, exact IDs skip the fuzzy scan
+    if operator in operator_table:
+        return (operator, operator_table[operator])
 
-handbook_info_table = None
+    char_id = game_data.resolve("operator", operator)
+    return (char_id, operator_table[char_id])
 
 
-def get_operator_file(operator: str) -> Tuple[str, dict]:
+def get_operator_file(operator: str, game_data: GameData = None) -> Tuple[str, dict]:
     """
     Grabs operator's detailed file (search by operator name, ID or appellation)
 
     Args:
         operator (str): Operator name, ID or appellation
+        game_data (GameData, optional): Game data version, the one pinned by the running command by default. Defaults to None.
 
     Returns:
         Tuple[str, dict]: A tuple contains a str denote the operator's name and dict that contains the operator profile with ID, name or appellation that matches the parameter
     """
 
+    game_data = game_data or pinned()
+
     # Search for operator
-    info = get_operator_info(operator)
+    info = get_operator_info(operator, game_data)
 
     # Get operator id
     char_id = info[0]
 
-    # Check if handbook_info_table is already loaded and load it from local file
-    global handbook_info_table
-    if handbook_info_table is None:
-        with open(f"ArknightsData/{locale}/gamedata/excel/handbook_info_table.json", "r", encoding="UTF-8") as f:
-            handbook_info_table = json.load(f)
-
-    # Get operator profile
-    return (info[1]["name"], handbook_info_table["handbookDict"][char_id])
-
-
-charword_table = None
+    # Get operator profile, only decoding its record when the table is memory-mapped
+    return (info[1]["name"], game_data.load_records("handbooks")[char_id])
 
 
-def get_operator_audio(operator: str) -> Tuple[str, List[dict]]:
+def get_operator_audio(operator: str, game_data: GameData = None) -> Tuple[str, List[dict]]:
     """
     Grabs operator's voice records (search by operator name, ID or appellation)
 
     Args:
         operator (str): Operator name, ID or appellation
+        game_data (GameData, optional): Game data version, the one pinned by the running command by default. Defaults to None.
 
     Returns:
         Tuple[str, List[dict]]: A tuple contains a str denote the operator's name and a list of dict that contains the operator's audio records with ID, name or appellation that matches the parameter
     """
 
+    game_data = game_data or pinned()
+
     # Search for operator
-    info = get_operator_info(operator)
+    info = get_operator_info(operator, game_data)
 
     # Get default skin ID
     char_id = info[0]
 
-    # Check if charword_table is already loaded and load it from local file
-    global charword_table
-    if charword_table is None:
-        with open(f"ArknightsData/{locale}/gamedata/excel/charword_table.json", "r", encoding="UTF-8") as f:
-            charword_table = json.load(f)
-
-    # Get voice records
-    return (info[1]["name"], sorted([voice for voice in charword_table.values() if voice["charId"] == char_id], key=lambda voice: voice["voiceIndex"]))
-
+    # Get voice records, sorted by voiceIndex
+    return (info[1]["name"], game_data.load_group("voices", char_id))
 
-skin_table = None
 
-
-def get_operator_skins(operator: str) -> List[dict]:
+def get_operator_skins(operator: str, game_data: GameData = None) -> List[dict]:
     """
     Grabs operator's skins detailed infos (search by operator name, ID or appellation)
 
     Args:
         operator (str): Operator name, ID or appellation
+        game_data (GameData, optional): Game data version, the one pinned by the running command by default. Defaults to None.
 
     Returns:
         List[dict]: A list of dict that contains the operator's skins with ID, name or appellation that matches the parameter
     """
 
+    game_data = game_data or pinned()
+
     # Search for operator
-    info = get_operator_info(operator)
+    info = get_operator_info(operator, game_data)
 
     # Get operator ID
     char_id = info[0]
 
-    # Check if skin_table is already loaded and load it from local file
-    global skin_table
-    if skin_table is None:
-        with open(f"ArknightsData/{locale}/gamedata/excel/skin_table.json", "r", encoding="UTF-8") as f:
-            skin_table = json.load(f)
-
-    # Get list of operator skins mapped by skin ID
-    skin_list = skin_table["charSkins"]
-    return [skin for skin in skin_list.values() if skin["charId"] == char_id]
-
+    # Get list of operator skins
+    return game_data.load_group("skins", char_id)
 
-skill_table = None
 
-
-def get_operator_skills(operator: str) -> List[dict]:
+def get_operator_skills(operator: str, game_data: GameData = None) -> List[dict]:
     """
     Grabs operator skills detailed infos (search by operator name, ID or appellation)
 
     Args:
         operator (str): Operator name, ID or appellation
+        game_data (GameData, optional): Game data version, the one pinned by the running command by default. Defaults to None.
 
     Returns:
         List[dict]: A list of tuple (skill from character_table, skill from skill_table) that contains the operator skills with ID, name or appellation that matches the parameter
     """
 
+    game_data = game_data or pinned()
+
     # Search for operator
-    info = get_operator_info(operator)
+    info = get_operator_info(operator, game_data)
 
     # Get operator skills
     skills = info[1]["skills"]
 
-    # Check if skill_table is already loaded and load it from local file
-    global skill_table
-    if skill_table is None:
-        with open(f"ArknightsData/{locale}/gamedata/excel/skill_table.json", "r", encoding="UTF-8") as f:
-            skill_table = json.load(f)
+    skill_table = game_data.load_table("skill_table")
 
     # Return a list of tuple with skill info from operator_table and skill_table
     # As for why, the skill data from 2 tables are different but both useful
     return [(skill, skill_table[skill["skillId"]]) for skill in skills]
 
 
-hidden_table = None
-
-
-def get_operator_by_tags(tags: list) -> List[dict]:
+def get_operator_by_tags(tags: list, game_data: GameData = None) -> List[dict]:
     """
     Grabs operators that contains given tags
 
     Args:
         tags (list): The input tags list (input must be correct)
+        game_data (GameData, optional): Game data version, the one pinned by the running command by default. Defaults to None.
+
+    Returns:
+        List[dict]: A list of dict that contains operator's name, tag list (with position, profession and rarity tags) and rarity, empty until akhr.json has been fetched
+    """
+
+    game_data = game_data or pinned()
+
+    engine = game_data.load_recruitment()
+    if engine is None:
+        return []
+
+    # Copies, so that the engine's tags are never modified
+    return [{"name": x.name, "tagList": list(x.tags), "rarity": x.rarity}
+            for x in engine.match_any(tags)]
+
+
+def get_recruitment(tags: List[str], game_data: GameData = None) -> Optional[List[Tuple[Tuple[str, ...], List[Tuple[str, int]]]]]:
+    """
+    Grabs operators obtainable with every combination of 1 to 3 recruitment tags
+
+    Args:
+        tags (List[str]): The offered tags (input must be correct)
+        game_data (GameData, optional): Game data version, the one pinned by the running command by default. Defaults to None.
+
+    Returns:
+        Optional[List[Tuple[Tuple[str, ...], List[Tuple[str, int]]]]]: A list of tuple (tag combination, list of tuple (operator name, rarity)) for combinations that match operators,
+                                                                        None until akhr.json has been fetched
+    """
+
+    game_data = game_data or pinned()
+
+    engine = game_data.load_recruitment()
+    return engine.recruit(tags) if engine is not None else None
+
+
+def get_recruitment_guarantees(tags: List[str], game_data: GameData = None) -> Optional[List[Tuple[Tuple[str, ...], int, List[Tuple[str, int]]]]]:
+    """
+    Grabs the combinations of 1 to 3 recruitment tags that guarantee a 4* or higher operator
+
+    Args:
+        tags (List[str]): The offered tags (input must be correct)
+        game_data (GameData, optional): Game data version, the one pinned by the running command by default. Defaults to None.
 
     Returns:
-        List[dict]: A list of dict that contains operator's name, position (Ranged or Melee), tag list. rarity and profession
-    """
-
-    url = "https://raw.githubusercontent.com/Aceship/AN-EN-Tags/master/json/akhr.json"
-    # Check if operator_table and hidden_table is already loaded and load it
-    # from local file or fetch it
-    global operator_table, hidden_table
-    if operator_table is None:
-        with open(f"ArknightsData/{locale}/gamedata/excel/character_table.json", "r", encoding="UTF-8") as f:
-            operator_table = json.load(f)
-    if hidden_table is None:
-        hidden_table = fetch(url)
-
-    # As the operator_table doesn't actually show which operator we can't get from recruitment, we need Aceship's akhr file to check
-    # Even though in character_table.json there's a key named
-    # "itemOptainApproach", I don't use it to check because it's faulty (?) as
-    # Indra is supposed to be a Recruitment only operator but it shows
-    # "Recruitment & Headhunting" in her "itemOptainApproach"
-    hidden_list = [{x["name"]: x["hidden"]} for x in hidden_table]
-
-    # The actual work
-    operator_list = [
-        # Grabbing only what we need
-        {key: x[key]
-            for key in ["name", "position", "tagList", "rarity", "profession"]}
-        for x in operator_table.values()
-        if (
-            (
-                # Check for common tags
-                x["tagList"] is not None
-                and (set([i.lower() for i in x["tagList"]]) & set(tags))
-            )
-            # Check for position
-            or x["position"].lower() in tags
-            # Check for profession
-            or constants.PROFESSION_TABLE[x["profession"]].lower() in tags
-            # Check for Senior or Top Operator by rarity (0-indexed)
-            or ("senior operator" in tags and x["rarity"] == 4)
-            or ("top operator" in tags and x["rarity"] == 5)
-        )
-        # If operator is not in hidden_list, that means we can obtain through
-        # Recruitment
-        and {x["name"]: False} in hidden_list
-    ]
-
-    # Append the remaining tags as the tagList doesn't contain position,
-    # profession or rarity
-    for operator in operator_list:
-        operator["tagList"].append(operator.pop("position", None).title())
-        operator["tagList"].append(
-            constants.PROFESSION_TABLE[operator.pop(
-                "profession", None)].title()
-        )
-        if operator["rarity"] == 4:
-            operator["tagList"].append("Senior Operator")
-        if operator["rarity"] == 5:
-            operator["tagList"].append("Top Operator")
-
-    return operator_list
-
-
-item_table = None
-
-
-def get_item(item: str) -> dict:
+        Optional[List[Tuple[Tuple[str, ...], int, List[Tuple[str, int]]]]]: A list of tuple (tag combination, guaranteed rarity, list of tuple (operator name, rarity)), best combinations first,
+                                                                             None until akhr.json has been fetched
+    """
+
+    game_data = game_data or pinned()
+
+    engine = game_data.load_recruitment()
+    return engine.guarantees(tags) if engine is not None else None
+
+
+def get_item(item: str, game_data: GameData = None) -> dict:
     """
     Grabs detailed item info (search by name or ID)
 
     Args:
         item (str): Item name or ID
+        game_data (GameData, optional): Game data version, the one pinned by the running command by default. Defaults to None.
 
     Returns:
         dict: A dict that contains item info with name or ID that matches the parameter
     """
 
-    # Check if item_table is already loaded and load it from local file
-    global item_table
-    if item_table is None:
-        with open(f"ArknightsData/{locale}/gamedata/excel/item_table.json", "r", encoding="UTF-8") as f:
-            item_table = json.load(f)
+    game_data = game_data or pinned()
+
+    item_table = game_data.load_table("item_table")
 
     # Get item list from table
     item_list = item_table["items"]
-    return max(
-        list(item_list.values()),
-        # Match name or ID
-        key=lambda x: max(ratio(x["name"], item), ratio(x["itemId"], item)),
-    )
+    if item in item_list:
+        return item_list[item]
+
+    return item_list[game_data.resolve("item", item)]
+
+
+def get_stage_info(stage: str, game_data: GameData = None) -> dict:
+    """
+    Grabs stage info (search by name, code or ID) without its level data
+
+    Args:
+        stage (str): Stage name, code or ID
+        game_data (GameData, optional): Game data version, the one pinned by the running command by default. Defaults to None.
+
+    Returns:
+        dict: A dict that contains stage info with name, code or ID that matches the parameter
+    """
+
+    game_data = game_data or pinned()
+
+    # Get stage list
+    stage_list = game_data.load_records("stages")
+
+    if stage in stage_list:
+        return stage_list[stage]
+
+    return stage_list[game_data.resolve("stage", stage)]
+
+
+def get_level_summary(level_id: str, game_data: GameData = None) -> dict:
+    """
+    Grabs the summary of a level file, parsing it only if it isn't cached
+
+    Args:
+        level_id (str): Level ID (input must be correct)
+        game_data (GameData, optional): Game data version, the one pinned by the running command by default. Defaults to None.
+
+    Returns:
+        dict: A dict that contains the level options and a list of tuple (enemy name, count) sorted by enemy sortId
+    """
+
+    game_data = game_data or pinned()
+
+    summary = game_data.level_cache.get(level_id)
+    if summary is not None:
+        return summary
+
+    with open(f'ArknightsData/{game_data.locale}/gamedata/levels/{level_id.lower()}.json', "r", encoding="UTF-8") as f:
+        level = json.load(f)
 
+    # Count enemies by extracting waves
+    # I can't really find a better way to do this, maybe the database is missing some parts ?
+    actions = [action for wave in level["waves"] for fragment in wave["fragments"]
+               for action in fragment["actions"] if action["actionType"] == 0]
+    enemies = get_rewards([{"id": action["key"], "type": "ENEMY"} for action in actions], game_data)
+    enemies_count = {}
+    for action, enemy in zip(actions, enemies):
+        if enemy["name"] not in enemies_count:
+            enemies_count[enemy["name"]] = {
+                "sort": enemy["sortId"],
+                "count": 0
+            }
+        enemies_count[enemy["name"]]["count"] += action["count"]
 
-stage_table = None
+    # Only keep what commands need, the whole level is much larger
+    summary = {
+        "options": level["options"],
+        "enemies": [(name, enemy["count"]) for name, enemy in sorted(enemies_count.items(), key=lambda item: item[1]["sort"])],
+    }
+    game_data.level_cache.put(level_id, summary)
 
+    return summary
 
-def get_stage(stage: str) -> Tuple[dict, dict, Optional[dict]]:
+
+def get_stage(stage: str, game_data: GameData = None) -> Tuple[dict, dict, Optional[dict]]:
     """
     Grabs detailed stage info (search by name, code or ID)
 
     Args:
-        stage (str): stage (str): Stage name, code or ID
+        stage (str): Stage name, code or ID
+        game_data (GameData, optional): Game data version, the one pinned by the running command by default. Defaults to None.
 
     Returns:
-        Tuple[dict, dict, Optional[dict]]:  A tuple of dict that contains stage info with name, code or ID that matches the parameter. 
+        Tuple[dict, dict, Optional[dict]]:  A tuple of dict that contains stage info with name, code or ID that matches the parameter and its level summary.
                                             Last variable is a dict if stage is annihilation
     """
 
-    # Check if stage_table is already loaded and load it from local file
-    global stage_table
-    if stage_table is None:
-        with open(f"ArknightsData/{locale}/gamedata/excel/stage_table.json", "r", encoding="UTF-8") as f:
-            stage_table = json.load(f)
+    game_data = game_data or pinned()
 
-    # Get stage list
-    stage_list = stage_table["stages"]
-
-    stage_info = max(
-        list(stage_list.values()),
-        key=lambda x: max(
-            # Match ID
-            ratio(x["stageId"], stage),
-            # Match code
-            ratio(x["code"], stage),
-            # Match name
-            ratio(x["name"] or "", stage),
-        ),
-    )
+    stage_info = get_stage_info(stage, game_data)
 
     # Additional info
-    stage_extra_info = None
-    with open(f'ArknightsData/{locale}/gamedata/levels/{stage_info["levelId"].lower()}.json', "r", encoding="UTF-8") as f:
-        stage_extra_info = json.load(f)
+    stage_extra_info = get_level_summary(stage_info["levelId"], game_data)
 
     # Annihilatio
     anni_info = None
     if stage_info["stageType"] == "CAMPAIGN":
-        anni_info = stage_table["campaigns"][stage_info["stageId"]]
+        anni_info = game_data.load_records("campaigns")[stage_info["stageId"]]
 
     return (stage_info, stage_extra_info, anni_info)
 
 
-def get_stage_with_item(id: str) -> List[dict]:
+def get_stage_with_item(id: str, game_data: GameData = None) -> List[dict]:
     """
     Grabs stages that drops item with id
 
     Args:
         id (str): Item ID (input must be correct)
+        game_data (GameData, optional): Game data version, the one pinned by the running command by default. Defaults to None.
 
     Returns:
         List[dict]: A list that contains tuple (stage that drop item with ID, probability of item dropping)
     """
 
-    # Check if stage_table is already loaded and load it from local file
-    global stage_table
-    if stage_table is None:
-        with open(f"ArknightsData/{locale}/gamedata/excel/stage_table.json", "r", encoding="UTF-8") as f:
-            stage_table = json.load(f)
+    game_data = game_data or pinned()
 
     # Get stage list
-    stage_list = stage_table["stages"]
+    stage_list = game_data.load_records("stages")
 
-    def get_index(lst: list) -> Optional[int]:
-        """
-        Get index of item that has the same ID with given ID in item drop list of stage
-        Returns None if item is not in list
-        """
-        return next((idx for (idx, dt) in enumerate(
-            lst) if dt["id"] == id), None)
-
-    return [
-        (
-            # Stage info
-            x,
-            # Item drop type (Probability of dropping)
-            # I'm sure there are better ways to do this but i'm a noob
-            x["stageDropInfo"]["displayDetailRewards"][
-                get_index(x["stageDropInfo"]["displayDetailRewards"])
-            ]["dropType"],
-        )
-        for x in list(stage_list.values())
-        # Check if item is in list
-        if get_index(x["stageDropInfo"]["displayDetailRewards"]) is not None
-    ]
-
-
-building_data = None
+    # Stages that drop the item, with the item drop type (Probability of dropping)
+    return [(stage_list[stage_id], drop_type) for stage_id, drop_type in game_data.load_index("drops").get(id, [])]
 
 
-def get_furniture(furniture: str) -> dict:
+def get_furniture(furniture: str, game_data: GameData = None) -> dict:
     """
     Grabs detailed furniture info (search by name or ID)
 
     Args:
         furniture (str): Furniture name or ID
+        game_data (GameData, optional): Game data version, the one pinned by the running command by default. Defaults to None.
 
     Returns:
         dict: A dict that contains furniture info with name or ID that matches the parameter
     """
 
-    # Check if building_data is already loaded and load it from local file
-    global building_data
-    if building_data is None:
-        with open(f"ArknightsData/{locale}/gamedata/excel/building_data.json", "r", encoding="UTF-8") as f:
-            building_data = json.load(f)
+    game_data = game_data or pinned()
+
+    building_data = game_data.load_table("building_data")
 
     # Get furniture list
     furniture_list = building_data["customData"]["furnitures"]
-    return max(
-        list(furniture_list.values()),
-        # Match name or ID
-        key=lambda x: max(ratio(x["name"], furniture),
-                          ratio(x["id"], furniture)),
-    )
-
+    if furniture in furniture_list:
+        return furniture_list[furniture]
 
-enemy_handbook_table = None
+    return furniture_list[game_data.resolve("furniture", furniture)]
 
 
-def get_enemy(enemy: str) -> dict:
+def get_enemy(enemy: str, game_data: GameData = None) -> dict:
     """
     Grabs detailed enemy info (search by name or ID)
 
     Args:
         enemy (str): Enemy name or ID
+        game_data (GameData, optional): Game data version, the one pinned by the running command by default. Defaults to None.
 
     Returns:
         dict: A dict that contains enemy info with name or ID that matches the parameter
     """
 
-    # Check if enemy_handbook_table is already loaded and load it from local
-    # file
-    global enemy_handbook_table
-    if enemy_handbook_table is None:
-        with open(
-            f"ArknightsData/{locale}/gamedata/excel/enemy_handbook_table.json", "r"
-        ) as f:
-            enemy_handbook_table = json.load(f)
+    game_data = game_data or pinned()
 
-    return max(
-        list(enemy_handbook_table.values()),
-        # Match name or ID
-        key=lambda x: max(ratio(x["name"], enemy), ratio(x["enemyId"], enemy)),
-    )
+    enemy_handbook_table = game_data.load_table("enemy_handbook_table")
+
+    if enemy in enemy_handbook_table:
+        return enemy_handbook_table[enemy]
+
+    return enemy_handbook_table[game_data.resolve("enemy", enemy)]
+
+
+def get_rewards(rewards: List[dict], game_data: GameData = None) -> List[dict]:
+    """
+    Grabs the records of many rewards at once (e.g. stage drops, annihilation rewards or level wave enemies)
+    Rewards are grouped by type so that each table is only looked up once
+
+    Args:
+        rewards (List[dict]): Dicts with an id and a type (TKT_RECRUIT for operators, FURN for furniture, ENEMY for enemies, items otherwise)
+        game_data (GameData, optional): Game data version, the one pinned by the running command by default. Defaults to None.
+
+    Returns:
+        List[dict]: The item, operator, furniture or enemy record of each reward, in order
+    """
 
+    game_data = game_data or pinned()
 
-tip_table = None
+    # Positions of the rewards of each kind
+    groups = {}
+    for position, reward in enumerate(rewards):
+        groups.setdefault(REWARD_TYPES.get(reward.get("type"), "item"), []).append(position)
 
+    records = [None] * len(rewards)
+    for name, positions in groups.items():
+        table = REWARD_RECORDS[name](game_data)
+        for position in positions:
+            id = rewards[position]["id"]
+            # IDs come from the game data and are almost always exact
+            records[position] = table[id] if id in table else table[game_data.resolve(name, id)]
 
-def get_tips(category: str) -> dict:
+    return records
+
+
+def get_tips(category: str, game_data: GameData = None) -> dict:
     """
     Grabs a random tip (with or without category)
 
     Args:
         category (str): Category of tip (optional) (must be correct)
+        game_data (GameData, optional): Game data version, the one pinned by the running command by default. Defaults to None.
 
     Returns:
         dict: A dict that contains tip about given category
     """
 
-    # Check if tip_table is already loaded and load it from local file
-    global tip_table
-    if tip_table is None:
-        with open(f"ArknightsData/{locale}/gamedata/excel/tip_table.json", "r", encoding="UTF-8") as f:
-            tip_table = json.load(f)
+    game_data = game_data or pinned()
+
+    tip_table = game_data.load_table("tip_table")
 
     # Get tip list
     tip_list = tip_table["tips"]
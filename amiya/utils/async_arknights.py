@@ -0,0 +1,130 @@
+"""
+Async facade over amiya.utils.arknights
+Every lookup runs in a bounded thread pool so that JSON parsing, file I/O and fuzzy matching never block the event loop
+Reloads of the game data, on demand or when its files change, run in the background too
+"""
+
+import asyncio
+import contextvars
+import functools
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+from amiya.utils import arknights, metrics, profiling, snapshot
+
+# Bounded so that a burst of commands queues up instead of spawning threads
+executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("DATA_WORKERS", 4)),
+    thread_name_prefix="arknights")
+
+
+async def run(func: Callable, *args, **kwargs) -> Any:
+    """
+    Runs a blocking function in the data thread pool
+
+    Args:
+        func (Callable): The function to run
+        *args, **kwargs: Arguments passed to func
+
+    Returns:
+        Any: The function result
+    """
+
+    loop = asyncio.get_event_loop()
+    # Run in a copy of the caller's context, so that the data version pinned by the command is used
+    context = contextvars.copy_context()
+    call = functools.partial(context.run, func, *args, **kwargs)
+    # Profiled in the worker thread when the command is
+    session = profiling.active()
+    if session is not None:
+        call = functools.partial(session.run, call)
+    with metrics.phase("lookup"):
+        return await loop.run_in_executor(executor, call)
+
+
+async def reload(build_snapshots: bool = True) -> arknights.GameData:
+    """
+    Loads a new version of the game data in the background and swaps it in
+
+    Args:
+        build_snapshots (bool, optional): Recompile the snapshots first when they are used. Defaults to True.
+
+    Returns:
+        arknights.GameData: The new version
+    """
+
+    # Not in the data thread pool, which keeps serving commands meanwhile
+    loop = asyncio.get_event_loop()
+    return await loop.run_in_executor(None, arknights.reload, build_snapshots)
+
+
+def _sources() -> list:
+    """ Size and modification time of every game data file """
+    return snapshot.signature(
+        [arknights.table_path(name, data_locale) for data_locale in arknights.current for name in arknights.TABLES])
+
+
+async def watch(interval: float) -> None:
+    """
+    Reloads the game data when its files change, meant to run as a background task
+    Files are polled every interval, a reload starts once they stopped changing for a whole interval (e.g. after a submodule update)
+
+    Args:
+        interval (float): Seconds between polls
+    """
+
+    loop = asyncio.get_event_loop()
+    last = await loop.run_in_executor(None, _sources)
+    changed = False
+
+    while True:
+        await asyncio.sleep(interval)
+
+        try:
+            sources = await loop.run_in_executor(None, _sources)
+        except OSError:
+            # A file is missing in the middle of an update
+            changed = True
+            continue
+
+        if sources != last:
+            last = sources
+            changed = True
+        elif changed:
+            changed = False
+            logging.info("Game data files changed, reloading")
+            try:
+                await reload()
+            except Exception:
+                logging.exception(
+                    f"Reloading game data failed, still serving version {arknights.pinned().version}")
+
+
+def _offload(func: Callable) -> Callable:
+    """ Wraps an arknights function into a coroutine function running in the data thread pool """
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        return await run(func, *args, **kwargs)
+
+    return wrapper
+
+
+get_operator_info = _offload(arknights.get_operator_info)
+get_operator_file = _offload(arknights.get_operator_file)
+get_operator_audio = _offload(arknights.get_operator_audio)
+get_operator_skins = _offload(arknights.get_operator_skins)
+get_operator_skills = _offload(arknights.get_operator_skills)
+get_operator_by_tags = _offload(arknights.get_operator_by_tags)
+get_recruitment = _offload(arknights.get_recruitment)
+get_recruitment_guarantees = _offload(arknights.get_recruitment_guarantees)
+get_item = _offload(arknights.get_item)
+get_stage_info = _offload(arknights.get_stage_info)
+get_stage = _offload(arknights.get_stage)
+get_stage_with_item = _offload(arknights.get_stage_with_item)
+get_furniture = _offload(arknights.get_furniture)
+get_enemy = _offload(arknights.get_enemy)
+get_rewards = _offload(arknights.get_rewards)
+get_tips = _offload(arknights.get_tips)
@@ -0,0 +1,111 @@
+"""
+Bounded caches
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+
+class LRUCache:
+    """ Size-bounded mapping that evicts the least recently used key, with hit/miss/eviction counters """
+
+    def __init__(self, maxsize: int = 1024, maxweight: Optional[int] = None, weigh: Optional[Callable[[Any], int]] = None):
+        """
+        Initialize a new LRUCache.
+
+        Args:
+            maxsize (int, optional): Maximum number of keys kept. Defaults to 1024.
+            maxweight (Optional[int], optional): Maximum total weight of the values kept, unbounded if None. Defaults to None.
+            weigh (Optional[Callable[[Any], int]], optional): Weight of a value (e.g. its size in bytes), required with maxweight. Defaults to None.
+        """
+
+        self.maxsize = maxsize
+        self.maxweight = maxweight
+        self.weigh = weigh
+        self.weight = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data = OrderedDict()
+        # Key -> weight of its value, only when weighed
+        self._weights = {}
+        # Lookups may run in worker threads
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._data
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Grabs the value cached for key and marks it as recently used
+
+        Args:
+            key (Hashable): The key
+            default (Any, optional): Returned on a miss. Defaults to None.
+
+        Returns:
+            Any: The cached value or default
+        """
+
+        with self._lock:
+            if key not in self._data:
+                self.misses += 1
+                return default
+
+            self.hits += 1
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """
+        Caches value for key, evicting the least recently used keys if full
+
+        Args:
+            key (Hashable): The key
+            value (Any): The value
+        """
+
+        weight = self.weigh(value) if self.weigh is not None else 0
+
+        with self._lock:
+            self.weight += weight - self._weights.pop(key, 0)
+            if self.weigh is not None:
+                self._weights[key] = weight
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize or (self.maxweight is not None and self.weight > self.maxweight):
+                evicted, _ = self._data.popitem(last=False)
+                self.weight -= self._weights.pop(evicted, 0)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """ Drops every cached value, counters are kept """
+
+        with self._lock:
+            self._data.clear()
+            self._weights.clear()
+            self.weight = 0
+
+    def stats(self) -> dict:
+        """
+        Grabs the cache counters
+
+        Returns:
+            dict: A dict that contains size, maxsize, weight, maxweight, hits, misses, evictions and hit rate
+        """
+
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "weight": self.weight,
+            "maxweight": self.maxweight,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / total if total > 0 else 0.0,
+        }
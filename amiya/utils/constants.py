@@ -2,28 +2,37 @@
 Store constant data
 """
 
-import json
 import sys
 
-from inflection import underscore
+
+def convert(gamedata_const: dict) -> dict:
+    """
+    Names the game constants following PEP8
+
+    Args:
+        gamedata_const (dict): The gamedata_const table
+
+    Returns:
+        dict: A dict that maps constant name (e.g. maxPlayerLevel -> MAX_PLAYER_LEVEL) to its value
+    """
+
+    # Only needed once per locale, not at startup
+    from inflection import underscore
+
+    return {underscore(key).upper(): value for key, value in gamedata_const.items()}
 
 
 def setup() -> None:
     """
-    Assigns constants to module
+    Assigns the constants of the default locale to module, the constants of each locale are on its GameData
     """
 
-    # Load json data to gamedata_const
-    gamedata_const = None
-    with open("ArknightsData/en-US/gamedata/excel/gamedata_const.json", "r") as f:
-        gamedata_const = json.load(f)
+    # Imported here as arknights loads this module
+    from amiya.utils import arknights
 
     # Assign variables to module
-    for key, value in gamedata_const.items():
-        setattr(
-            sys.modules[__name__],
-            underscore(key).upper(), # Following PEP8
-            value)
+    for key, value in arknights.current[arknights.locale].load_constants().items():
+        setattr(sys.modules[__name__], key, value)
 
 
 # Item occurrence
@@ -0,0 +1,129 @@
+"""
+Structure sharing between the tables of several locales
+Most of a table is identical across locales (IDs, numeric stats, drop tables), only localized strings differ
+Hash-consing replaces identical values (strings, numbers, and lists or dicts of identical values) by one shared object,
+so that each locale only costs its localized parts
+Shared objects must never be modified
+"""
+
+import sys
+import threading
+from itertools import chain
+from typing import Any, Iterable, List, Tuple
+
+
+class Interner:
+    """ Pool of canonical values, meant to be dropped once the tables of every locale are loaded """
+
+    def __init__(self):
+        # Hash of the ids of canonical children -> canonical containers with that hash
+        self._containers = {}
+        # Ids of canonical containers, which don't need to be shared again
+        self._canonical = set()
+        # Type -> canonical scalars, kept apart as 1, 1.0 and True are equal
+        self._scalars = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._canonical) + sum(len(x) for x in self._scalars.values())
+
+    def share(self, value: Any) -> Any:
+        """
+        Replaces every part of a value by its canonical equivalent
+
+        Args:
+            value (Any): A parsed JSON value
+
+        Returns:
+            Any: The canonical value, to use instead of the given one
+        """
+
+        with self._lock:
+            return self._share(value)
+
+    def pairs_hook(self, pairs: List[Tuple[str, Any]]) -> dict:
+        """
+        json object_pairs_hook sharing objects while they are parsed, so that duplicates are freed right away
+
+        Args:
+            pairs (List[Tuple[str, Any]]): The parsed pairs of an object, nested objects are already shared
+
+        Returns:
+            dict: The canonical object
+        """
+
+        with self._lock:
+            return self._share(dict(pairs))
+
+    def _share(self, value: Any) -> Any:
+        value_type = type(value)
+        if value_type is not dict and value_type is not list and value_type is not tuple:
+            if value is None:
+                return value
+            scalars = self._scalars.setdefault(value_type, {})
+            return scalars.setdefault(value, value)
+
+        if id(value) in self._canonical:
+            return value
+
+        # Children first, so that equal containers have the very same children
+        if value_type is dict:
+            value = {self._share(k): self._share(v) for k, v in value.items()}
+            children = list(chain.from_iterable(value.items()))
+        else:
+            value = value_type(self._share(x) for x in value)
+            children = list(value)
+
+        # Only hashes are kept, equal containers are found by comparing the ids of their children
+        key = hash((value_type, *map(id, children)))
+        for canonical in self._containers.get(key, ()):
+            other = list(chain.from_iterable(canonical.items())) if value_type is dict else canonical
+            if type(canonical) is value_type and len(other) == len(children) and all(a is b for a, b in zip(other, children)):
+                self.hits += 1
+                return canonical
+
+        self.misses += 1
+        self._containers.setdefault(key, []).append(value)
+        self._canonical.add(id(value))
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._containers.clear()
+            self._canonical.clear()
+            self._scalars.clear()
+
+
+def deep_size(roots: Iterable[Any], seen: set) -> int:
+    """
+    Sums the size of objects reachable from the roots through dicts, lists and tuples, each object once
+
+    Args:
+        roots (Iterable[Any]): Objects to measure
+        seen (set): Ids of objects already counted, updated with the measured ones
+
+    Returns:
+        int: The size in bytes of the objects that weren't seen before
+    """
+
+    size = 0
+    stack = list(roots)
+    while stack:
+        value = stack.pop()
+        if id(value) in seen:
+            continue
+        seen.add(id(value))
+        size += sys.getsizeof(value)
+
+        if type(value) is dict:
+            stack.extend(value.keys())
+            stack.extend(value.values())
+        elif type(value) in (list, tuple):
+            stack.extend(value)
+        elif hasattr(value, "__dict__") and not isinstance(value, type):
+            # Indexes and other plain objects
+            stack.append(vars(value))
+
+    return size
@@ -1,12 +1,14 @@
 import asyncio
 import functools
 import logging
+import time
 from datetime import datetime
-from pytz import timezone
 
 import discord
 from discord.ext import commands
 
+from amiya.utils import metrics
+
 logger = logging.getLogger(__name__)
 
 _INFO_WHITE = 0xF0F0F0
@@ -29,6 +31,21 @@ def set_author_footer(embed, user):
     embed.set_footer(text=f"Requested by {user}", icon_url=user.avatar_url)
 
 
+async def send_cached_embed(ctx, cache, key, render):
+    """Sends the embed cached under `key`, only awaiting `render()` to build it on a miss.
+    Embeds are cached as payloads (`Embed.to_dict()`) shared between invocations, so embeds built
+    from them must not be modified.
+    """
+    payload = cache.get(key)
+    if payload is None:
+        embed = await render()
+        cache.put(key, embed.to_dict())
+    else:
+        embed = discord.Embed.from_dict(payload)
+
+    await ctx.send(embed=embed)
+
+
 def send_error_if(*error_cls):
     """Decorator for `cog_command_error` methods. Decorated methods send the error in an alert embed
     when the error is an instance of one of the specified errors, otherwise the wrapped function is
@@ -38,6 +55,7 @@ def send_error_if(*error_cls):
     def decorator(func):
         @functools.wraps(func)
         async def wrapper(cog, ctx, error):
+            metrics.record_error(ctx, error)
             if isinstance(error, error_cls):
                 await ctx.send(embed=embed_error(error))
                 error.handled = True
@@ -67,6 +85,9 @@ async def bot_error_handler(ctx, exception):
 
 async def presence(bot):
     """ Discord presence """
+    # Imported once connected, pytz is slow to import
+    from pytz import timezone
+
     await bot.change_presence(
         activity=discord.Activity(
             type=discord.ActivityType.listening, name="your commands"
@@ -83,3 +104,34 @@ async def presence(bot):
             )
         )
         await asyncio.sleep(60 - current_time.second)
+
+
+class LoopLagMonitor:
+    """ Measures how long the event loop gets blocked and attributes it to the commands in flight """
+
+    def __init__(self, interval=0.05, budget=0.1):
+        self.interval = interval
+        self.budget = budget
+        # Longest lag seen since boot and per running command
+        self.max_lag = 0.0
+        self._in_flight = {}
+
+    async def run(self):
+        """ Sleeps for `interval` in a loop, any extra time spent is time the loop was blocked """
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            lag = time.perf_counter() - start - self.interval
+
+            self.max_lag = max(self.max_lag, lag)
+            for ctx, command_lag in self._in_flight.items():
+                self._in_flight[ctx] = max(command_lag, lag)
+
+    async def before_invoke(self, ctx):
+        self._in_flight[ctx] = 0.0
+
+    async def after_invoke(self, ctx):
+        lag = self._in_flight.pop(ctx, 0.0)
+        if lag > self.budget:
+            logger.warning(
+                f"Event loop blocked for {lag * 1000:.0f} ms during {ctx.command} (budget {self.budget * 1000:.0f} ms)")
@@ -0,0 +1,73 @@
+"""
+Data locale chosen by each guild, kept in a JSON file
+"""
+
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Optional
+
+GUILD_LOCALES_PATH = Path(os.getenv("GUILD_LOCALES_PATH", "guild_locales.json"))
+
+# Guild ID (str, as JSON keys) -> data locale
+guild_locales = {}
+
+
+def load() -> None:
+    """
+    Reads the guild locales file
+    """
+
+    global guild_locales
+    if not GUILD_LOCALES_PATH.exists():
+        return
+
+    try:
+        with open(GUILD_LOCALES_PATH, "r", encoding="UTF-8") as f:
+            guild_locales = json.load(f)
+    except (OSError, ValueError):
+        logging.warning(f"Ignoring unreadable guild locales {GUILD_LOCALES_PATH}")
+        return
+
+    logging.info(f"Loaded the locales of {len(guild_locales)} guilds")
+
+
+def get_locale(guild_id: Optional[int]) -> Optional[str]:
+    """
+    Grabs the locale chosen by a guild
+
+    Args:
+        guild_id (Optional[int]): Guild ID, None outside of guilds
+
+    Returns:
+        Optional[str]: The locale, None if the guild didn't choose one
+    """
+
+    return guild_locales.get(str(guild_id))
+
+
+def set_locale(guild_id: int, data_locale: Optional[str]) -> None:
+    """
+    Saves the locale chosen by a guild
+
+    Args:
+        guild_id (int): Guild ID
+        data_locale (Optional[str]): The locale, None to go back to the default one
+    """
+
+    global guild_locales
+    locales = dict(guild_locales)
+    if data_locale is None:
+        locales.pop(str(guild_id), None)
+    else:
+        locales[str(guild_id)] = data_locale
+
+    # Write then rename so that a crash never leaves a partial file
+    tmp = GUILD_LOCALES_PATH.with_suffix(".tmp")
+    with open(tmp, "w", encoding="UTF-8") as f:
+        json.dump(locales, f)
+    os.replace(tmp, GUILD_LOCALES_PATH)
+
+    # Replaced as a whole, so that readers never see a partial update
+    guild_locales = locales
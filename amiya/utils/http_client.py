@@ -0,0 +1,168 @@
+"""
+Shared async HTTP client for remote data sources
+One keep-alive connection pool with per-host limits and timeouts, retries with jittered exponential backoff,
+and identical requests in flight are only sent once
+"""
+
+import asyncio
+import json
+import logging
+import os
+import random
+from typing import Any, Dict, Mapping, NamedTuple, Optional, Tuple
+
+import aiohttp
+
+# Connections kept open in the pool, overall and per host
+POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", 32))
+POOL_SIZE_PER_HOST = int(os.getenv("HTTP_POOL_SIZE_PER_HOST", 8))
+# Seconds before a request (including reading the body) is given up
+TIMEOUT = float(os.getenv("HTTP_TIMEOUT", 10))
+# Extra attempts after a connection error, a timeout or a retryable status
+RETRIES = int(os.getenv("HTTP_RETRIES", 2))
+# Seconds, the backoff before attempt n is drawn between 0 and RETRY_BACKOFF * 2 ** n
+RETRY_BACKOFF = float(os.getenv("HTTP_RETRY_BACKOFF", 0.5))
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class HTTPResponse(NamedTuple):
+    """ A fully read response """
+    request_info: aiohttp.RequestInfo
+    status: int
+    headers: Mapping[str, str]
+    body: bytes
+
+    def json(self) -> Any:
+        # Github serves raw files as text/plain, so the content type isn't checked
+        return json.loads(self.body)
+
+    def raise_for_status(self) -> None:
+        """
+        Raises:
+            aiohttp.ClientResponseError: If the status is an error (>= 400)
+        """
+
+        if self.status >= 400:
+            raise aiohttp.ClientResponseError(
+                self.request_info, (), status=self.status, headers=self.headers)
+
+
+class HTTPClient:
+    """ Pooled HTTP client, bound to the event loop it is first used in """
+
+    def __init__(self, pool_size: int = POOL_SIZE, pool_size_per_host: int = POOL_SIZE_PER_HOST,
+                 timeout: float = TIMEOUT, retries: int = RETRIES, retry_backoff: float = RETRY_BACKOFF):
+        self.pool_size = pool_size
+        self.pool_size_per_host = pool_size_per_host
+        self.timeout = timeout
+        self.retries = retries
+        self.retry_backoff = retry_backoff
+
+        self._session: Optional[aiohttp.ClientSession] = None
+        # (url, headers) -> request shared by every caller
+        self._in_flight: Dict[Tuple[str, tuple], asyncio.Future] = {}
+        # Requests actually sent, deduplicated ones excluded
+        self.sent = 0
+        self.deduplicated = 0
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=self.pool_size, limit_per_host=self.pool_size_per_host),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+        return self._session
+
+    async def get(self, url: str, headers: Optional[Mapping[str, str]] = None,
+                  timeout: Optional[float] = None) -> HTTPResponse:
+        """
+        Sends a GET request, or waits for the identical one already in flight
+
+        Args:
+            url (str): Request url
+            headers (Optional[Mapping[str, str]], optional): Request headers. Defaults to None.
+            timeout (Optional[float], optional): Seconds before the request, retries included, is given up. Defaults to None.
+
+        Raises:
+            aiohttp.ClientError: If every attempt failed to connect
+            asyncio.TimeoutError: If every attempt timed out, or the timeout expired
+
+        Returns:
+            HTTPResponse: The response, its status isn't checked
+        """
+
+        # The request stops at its own deadline, so only requests sharing it are deduplicated
+        key = (url, tuple(sorted((headers or {}).items())), timeout)
+        if key in self._in_flight:
+            self.deduplicated += 1
+        else:
+            self._in_flight[key] = asyncio.ensure_future(
+                self._get(url, headers, timeout))
+            self._in_flight[key].add_done_callback(
+                lambda _: self._in_flight.pop(key, None))
+
+        # Shielded, so that a cancelled caller doesn't cancel the request of the others
+        return await asyncio.shield(self._in_flight[key])
+
+    async def _get(self, url: str, headers: Optional[Mapping[str, str]], timeout: Optional[float]) -> HTTPResponse:
+        loop = asyncio.get_event_loop()
+        deadline = loop.time() + timeout if timeout is not None else None
+
+        for attempt in range(self.retries + 1):
+            # Each attempt is cut at the deadline
+            attempt_timeout = self.timeout
+            if deadline is not None:
+                attempt_timeout = min(attempt_timeout, deadline - loop.time())
+                if attempt_timeout <= 0:
+                    raise asyncio.TimeoutError()
+
+            try:
+                self.sent += 1
+                async with self.session.get(url, headers=headers,
+                                            timeout=aiohttp.ClientTimeout(total=attempt_timeout)) as response:
+                    result = HTTPResponse(
+                        response.request_info, response.status, response.headers.copy(), await response.read())
+                if result.status not in RETRY_STATUSES or attempt == self.retries:
+                    return result
+                logging.warning(f"GET {url} returned {result.status}, retrying")
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as error:
+                if attempt == self.retries or (deadline is not None and loop.time() >= deadline):
+                    raise
+                logging.warning(f"GET {url} failed ({error!r}), retrying")
+
+            # Full jitter, so that clients failing together don't retry together
+            delay = random.uniform(0, self.retry_backoff * 2 ** attempt)
+            if deadline is not None:
+                delay = min(delay, max(0, deadline - loop.time()))
+            await asyncio.sleep(delay)
+
+    async def get_json(self, url: str) -> Any:
+        """
+        Grabs JSON data
+
+        Args:
+            url (str): Request url
+
+        Raises:
+            aiohttp.ClientError: If the request failed or returned an error status
+            asyncio.TimeoutError: If the request timed out
+            ValueError: If the body isn't valid JSON
+
+        Returns:
+            Any: The parsed JSON
+        """
+
+        response = await self.get(url)
+        response.raise_for_status()
+        return response.json()
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+
+
+# Shared by every remote data source
+client = HTTPClient()
@@ -0,0 +1,237 @@
+"""
+Per-command latency histograms and error counters
+The time of a command, until its response is sent, is split between data lookups (async_arknights), Discord sends and
+the rest, which is rendering
+Metrics can be written in the Prometheus text format to METRICS_PATH (e.g. for node_exporter's textfile collector)
+"""
+
+import asyncio
+import bisect
+import logging
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Tuple
+
+# Upper bounds in seconds
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float("inf"))
+PHASES = ("lookup", "render", "send", "total")
+
+METRICS_PATH = os.getenv("METRICS_PATH")
+# Seconds between writes of METRICS_PATH
+METRICS_INTERVAL = float(os.getenv("METRICS_INTERVAL", 15))
+
+
+class Histogram:
+    """ Counts of observations per bucket, as Prometheus histograms """
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> float:
+        """
+        Estimates a quantile, interpolating inside its bucket
+
+        Args:
+            q (float): The quantile, between 0 and 1
+
+        Returns:
+            float: The estimated value in seconds, 0 without observations
+        """
+
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if count > 0 and seen + count >= rank:
+                lower = BUCKETS[i - 1] if i > 0 else 0.0
+                # The last bucket has no upper bound
+                upper = BUCKETS[i] if i < len(BUCKETS) - 1 else lower
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+        return 0.0
+
+
+class Timings:
+    """ Time spent in each phase of a running command """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.lookup = 0.0
+        self.send = 0.0
+        # When the response was sent, commands keep running afterwards (e.g. paginators)
+        self.responded = None
+
+
+# (command, phase) -> histogram
+histograms: Dict[Tuple[str, str], Histogram] = {}
+# (cog, error type) -> count
+errors: Dict[Tuple[str, str], int] = {}
+
+_timings = ContextVar("timings", default=None)
+
+
+@contextmanager
+def phase(name: str):
+    """
+    Adds the time spent in the block to the running command, unless it already responded
+
+    Args:
+        name (str): lookup or send
+    """
+
+    timings = _timings.get()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if timings is not None and timings.responded is None:
+            setattr(timings, name, getattr(timings, name) + time.perf_counter() - start)
+
+
+def responded():
+    """ Marks the response of the running command as sent, e.g. when a paginator displayed its first page """
+
+    timings = _timings.get()
+    if timings is not None and timings.responded is None:
+        timings.responded = time.perf_counter()
+
+
+async def before_invoke(ctx):
+    """ Starts timing a command """
+
+    _timings.set(Timings())
+
+    # Every response goes through ctx.send
+    send = ctx.send
+
+    async def timed_send(*args, **kwargs):
+        with phase("send"):
+            return await send(*args, **kwargs)
+
+    ctx.send = timed_send
+
+
+async def after_invoke(ctx):
+    """ Records the timings of a command """
+
+    timings = _timings.get()
+    if timings is None:
+        return
+
+    total = (timings.responded or time.perf_counter()) - timings.start
+    values = {
+        "lookup": timings.lookup,
+        "send": timings.send,
+        "render": max(0.0, total - timings.lookup - timings.send),
+        "total": total,
+    }
+    for name, value in values.items():
+        histograms.setdefault((ctx.command.qualified_name, name), Histogram()).observe(value)
+
+
+def record_error(ctx, error: Exception):
+    """ Counts an error raised by a command or a cog check """
+
+    error = getattr(error, "original", error)
+    key = (ctx.cog.qualified_name if ctx.cog is not None else "", type(error).__name__)
+    errors[key] = errors.get(key, 0) + 1
+
+
+def summary(command: str) -> Dict[str, float]:
+    """
+    Grabs the count and median of every phase of a command, and its 95th percentile
+
+    Args:
+        command (str): Qualified command name
+
+    Returns:
+        Dict[str, float]: A dict with count, the median of every phase and p95 in seconds
+    """
+
+    result = {"count": histograms[(command, "total")].count}
+    for name in PHASES:
+        result[name] = histograms[(command, name)].quantile(0.5)
+    result["p95"] = histograms[(command, "total")].quantile(0.95)
+    return result
+
+
+def commands() -> list:
+    """ Names of the commands with recorded timings, sorted """
+    return sorted({command for command, _ in histograms})
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def render() -> str:
+    """
+    Formats every metric in the Prometheus text exposition format
+
+    Returns:
+        str: The metrics
+    """
+
+    lines = [
+        "# HELP amiya_command_seconds Command latency by phase, until the response is sent",
+        "# TYPE amiya_command_seconds histogram",
+    ]
+    for (command, name), histogram in sorted(histograms.items()):
+        labels = f'command="{_label(command)}",phase="{name}"'
+        cumulative = 0
+        for bound, count in zip(BUCKETS, histogram.counts):
+            cumulative += count
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            lines.append(f'amiya_command_seconds_bucket{{{labels},le="{le}"}} {cumulative}')
+        lines.append(f"amiya_command_seconds_sum{{{labels}}} {histogram.sum}")
+        lines.append(f"amiya_command_seconds_count{{{labels}}} {histogram.count}")
+
+    lines.append("# HELP amiya_command_errors_total Errors raised by commands and cog checks")
+    lines.append("# TYPE amiya_command_errors_total counter")
+    for (cog, error), count in sorted(errors.items()):
+        lines.append(f'amiya_command_errors_total{{cog="{_label(cog)}",error="{_label(error)}"}} {count}')
+
+    return "\n".join(lines) + "\n"
+
+
+def write(text: str, path: str = METRICS_PATH):
+    """
+    Writes rendered metrics to a file, replaced at once so that a scraper never reads a partial file
+
+    Args:
+        text (str): The rendered metrics
+        path (str, optional): Metrics file. Defaults to METRICS_PATH.
+    """
+
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+async def export_loop(path: str = METRICS_PATH, interval: float = METRICS_INTERVAL):
+    """
+    Writes the metrics every interval, meant to run as a background task
+
+    Args:
+        path (str, optional): Metrics file. Defaults to METRICS_PATH.
+        interval (float, optional): Seconds between writes. Defaults to METRICS_INTERVAL.
+    """
+
+    loop = asyncio.get_event_loop()
+    while True:
+        # Rendered on the event loop, which is the only one updating the metrics
+        text = render()
+        try:
+            await loop.run_in_executor(None, write, text, path)
+        except OSError as error:
+            logging.warning(f"Writing metrics to {path} failed: {error}")
+        await asyncio.sleep(interval)
@@ -1,13 +1,85 @@
 # Credits goes to https://github.com/LiBa001/disputils
 
 import asyncio
+import logging
+import os
 from abc import ABC
-from copy import deepcopy
-from typing import List
+from collections import OrderedDict
+from typing import Callable, List, Union
 
 import discord
 from discord.ext import commands
 
+from amiya.utils import metrics, profiling
+
+
+class ReactionRouter:
+    """ Dispatches the reactions of every running paginator by message ID, so that each reaction is matched once """
+
+    def __init__(self, max_sessions: int = 1000):
+        """
+        Initialize a new ReactionRouter.
+
+        Args:
+            max_sessions (int, optional): Maximum number of running paginators, the least recently used ones are closed beyond. Defaults to 1000.
+        """
+
+        self.max_sessions = max_sessions
+        self.dispatched = 0
+        self.evictions = 0
+        # Message ID -> (reaction queue, check), least recently used first
+        self._sessions = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def open(self, message_id: int, check: Callable[[discord.Reaction, discord.User], bool]) -> asyncio.Queue:
+        """
+        Starts routing the reactions of a message.
+
+        Args:
+            message_id (int): ID of the message.
+            check (Callable[[discord.Reaction, discord.User], bool): Filters the reactions to route.
+
+        Returns:
+            asyncio.Queue: Queue of tuple (reaction, user), None once the session was evicted.
+        """
+
+        reactions = asyncio.Queue()
+        self._sessions[message_id] = (reactions, check)
+
+        while len(self._sessions) > self.max_sessions:
+            _, (evicted, _) = self._sessions.popitem(last=False)
+            evicted.put_nowait(None)
+            self.evictions += 1
+
+        return reactions
+
+    def close(self, message_id: int):
+        """
+        Stops routing the reactions of a message.
+
+        Args:
+            message_id (int): ID of the message.
+        """
+
+        self._sessions.pop(message_id, None)
+
+    async def on_reaction_add(self, reaction: discord.Reaction, user: discord.User):
+        """ Listener to add to the bot """
+
+        session = self._sessions.get(reaction.message.id)
+        if session is None or not session[1](reaction, user):
+            return
+
+        self._sessions.move_to_end(reaction.message.id)
+        session[0].put_nowait((reaction, user))
+        self.dispatched += 1
+
+
+# Shared by every paginator, set PAGINATOR_MAX_SESSIONS to change how many can run at once
+router = ReactionRouter(int(os.getenv("PAGINATOR_MAX_SESSIONS", 1000)))
+
 
 class Dialog(ABC):
     def __init__(self, *args, **kwargs):
@@ -69,7 +141,7 @@ class EmbedPaginator(Dialog):
     def __init__(
         self,
         client: discord.Client,
-        pages: [discord.Embed],
+        pages: [Union[discord.Embed, Callable[[], discord.Embed]]],
         message: discord.Message = None,
     ):
         """
@@ -77,7 +149,7 @@ class EmbedPaginator(Dialog):
         
         Args:
             client (discord.Client): The :class:`discord.Client` to use.
-            pages ([type]):  A list of :class:`discord.Embed` to paginate through.
+            pages ([type]):  A list of :class:`discord.Embed` to paginate through, or of functions rendering them when first displayed.
             message (discord.Message, optional): An optional :class:`discord.Message` to edit. Otherwise a new message will be sent. Defaults to None.
         """
         super().__init__()
@@ -85,25 +157,69 @@ class EmbedPaginator(Dialog):
         self._client = client
         self.pages = pages
         self.message = message
+        # Index -> numbered page, only the displayed page and its neighbors are kept
+        self._rendered = {}
 
         self.control_emojis = ("⏮", "◀", "▶", "⏭", "⏹")
 
-    @property
-    def formatted_pages(self):
-        pages = deepcopy(self.pages)  # copy by value not reference
-        for page in pages:
-            if page.footer.text == discord.Embed.Empty:
-                page.set_footer(text=f"({pages.index(page)+1}/{len(pages)})")
-            else:
-                if page.footer.icon_url == discord.Embed.Empty:
-                    page.set_footer(
-                        text=f"{page.footer.text} - ({pages.index(page)+1}/{len(pages)})")
-                else:
-                    page.set_footer(
-                        icon_url=page.footer.icon_url,
-                        text=f"{page.footer.text} - ({pages.index(page)+1}/{len(pages)})",
-                    )
-        return pages
+    @staticmethod
+    def format_page(page: discord.Embed, index: int, count: int) -> discord.Embed:
+        """
+        Copies a page with its page number in the footer.
+
+        Args:
+            page (discord.Embed): The page.
+            index (int): Index of the page.
+            count (int): Number of pages.
+
+        Returns:
+            discord.Embed: The numbered page, the given page is left as is.
+        """
+
+        # Embed.copy shares the nested dicts, set_footer replaces the footer instead of modifying it
+        page = page.copy()
+        if page.footer.text == discord.Embed.Empty:
+            page.set_footer(text=f"({index + 1}/{count})")
+        elif page.footer.icon_url == discord.Embed.Empty:
+            page.set_footer(text=f"{page.footer.text} - ({index + 1}/{count})")
+        else:
+            page.set_footer(
+                icon_url=page.footer.icon_url,
+                text=f"{page.footer.text} - ({index + 1}/{count})",
+            )
+        return page
+
+    def page(self, index: int) -> discord.Embed:
+        """
+        Grabs a page, rendering and numbering it if it isn't cached.
+
+        Args:
+            index (int): Index of the page.
+
+        Returns:
+            discord.Embed: The page, numbered if there are several.
+        """
+
+        if index not in self._rendered:
+            page = self.pages[index]
+            if not isinstance(page, discord.Embed):
+                page = page()
+            self._rendered[index] = self.format_page(
+                page, index, len(self.pages)) if len(self.pages) > 1 else page
+        return self._rendered[index]
+
+    def prefetch(self, index: int):
+        """
+        Keeps the neighbors of a page rendered, so that the next flip only has to send it.
+
+        Args:
+            index (int): Index of the displayed page.
+        """
+
+        self._rendered = {i: page for i, page in self._rendered.items() if abs(i - index) <= 1}
+        for i in (index + 1, index - 1):
+            if 0 <= i < len(self.pages):
+                self.page(i)
 
     async def run(self, users: List[discord.User], channel: discord.TextChannel = None):
         """
@@ -123,37 +239,71 @@ class EmbedPaginator(Dialog):
             raise TypeError(
                 "Missing argument. You need to specify a target channel.")
 
-        self._embed = self.pages[0]
+        # Only the first page is rendered before it is sent
+        self._embed = self.page(0)
+        with metrics.phase("send"):
+            self.message = await channel.send(embed=self._embed)
+        metrics.responded()
+        profiling.responded()
 
         if len(self.pages) == 1:  # no pagination needed in this case
-            self.message = await channel.send(embed=self._embed)
             return
 
-        self.message = await channel.send(embed=self.formatted_pages[0])
         current_page_index = 0
-
-        for emoji in self.control_emojis:
-            await self.message.add_reaction(emoji)
+        user_ids = {user.id for user in users}
 
         def check(r: discord.Reaction, u: discord.User):
-            res = (
-                r.message.id == self.message.id) and (
-                r.emoji in self.control_emojis)
+            # The router already matched the message
+            res = r.emoji in self.control_emojis and u.id != self._client.user.id
 
-            if len(users) > 0:
-                res = res and u.id in [u1.id for u1 in users]
+            if len(user_ids) > 0:
+                res = res and u.id in user_ids
 
             return res
 
+        # Listen before the control reactions are added, so that the first click is never missed
+        reactions = router.open(self.message.id, check)
+        controls = asyncio.ensure_future(self.add_controls())
+        self.prefetch(current_page_index)
+
+        try:
+            await self.paginate(reactions, current_page_index)
+        finally:
+            router.close(self.message.id)
+            controls.cancel()
+
+    async def add_controls(self):
+        """
+        Adds the control reactions.
+        Requests are sent together, Discord rate limits them per channel in the order they were sent.
+        """
+
+        try:
+            await asyncio.gather(*[self.message.add_reaction(emoji) for emoji in self.control_emojis])
+        except discord.HTTPException as error:
+            logging.warning(f"Adding paginator controls failed: {error}")
+
+    async def paginate(self, reactions: asyncio.Queue, current_page_index: int):
+        """
+        Flips pages until the paginator is stopped, idle for too long or closed by the router.
+
+        Args:
+            reactions (asyncio.Queue): Reactions routed to this paginator.
+            current_page_index (int): Index of the displayed page.
+        """
+
         while True:
             try:
-                reaction, user = await self._client.wait_for(
-                    "reaction_add", check=check, timeout=600
-                )
+                event = await asyncio.wait_for(reactions.get(), timeout=600)
             except asyncio.TimeoutError:
+                event = None
+
+            # Idle for too long, or evicted by newer paginators
+            if event is None:
                 await self.message.clear_reactions()
                 return
 
+            reaction, user = event
             emoji = reaction.emoji
             max_index = len(self.pages) - 1  # index for the last page
 
@@ -181,10 +331,12 @@ class EmbedPaginator(Dialog):
                 await self.message.delete()
                 return
 
-            await self.message.edit(embed=self.formatted_pages[load_page_index])
-            await self.message.remove_reaction(reaction, user)
+            await asyncio.gather(
+                self.message.edit(embed=self.page(load_page_index)),
+                self.message.remove_reaction(reaction, user))
 
             current_page_index = load_page_index
+            self.prefetch(current_page_index)
 
     @staticmethod
     def generate_sub_lists(l: list) -> [list]:
@@ -207,7 +359,7 @@ class BotEmbedPaginator(EmbedPaginator):
     def __init__(
         self,
         ctx: commands.Context,
-        pages: [discord.Embed],
+        pages: [Union[discord.Embed, Callable[[], discord.Embed]]],
         message: discord.Message = None,
     ):
         """
@@ -215,7 +367,7 @@ class BotEmbedPaginator(EmbedPaginator):
         
         Args:
             ctx (commands.Context): The :class:`discord.ext.commands.Context` to use.
-            pages ([type]): A list of :class:`discord.Embed` to paginate through.
+            pages ([type]): A list of :class:`discord.Embed` to paginate through, or of functions rendering them when first displayed.
             message (discord.Message, optional): An optional :class:`discord.Message` to edit. Otherwise a new message will be sent. Defaults to None.
         """
         self._ctx = ctx
@@ -0,0 +1,194 @@
+"""
+Profiling of a single command invocation
+The command runs under cProfile on the event loop thread, and each data lookup it offloads to async_arknights runs under
+its own profiler in its worker thread, all merged into one report
+Nothing is profiled outside of profile(), async_arknights only checks whether the running command is profiled
+"""
+
+import asyncio
+import cProfile
+import io
+import os
+import threading
+import time
+from contextvars import ContextVar
+from typing import Awaitable, Callable, Dict, Optional
+
+# Category -> parts of the file or function names it covers, the first matching category wins
+CATEGORIES = {
+    "fuzzy matching": ("amiya/utils/search.py", "fuzzywuzzy", "Levenshtein", "difflib"),
+    "JSON loading": ("json/", "_json", "amiya/utils/snapshot.py", "amiya/utils/recordstore.py", "pickle"),
+    "arknights": ("amiya/utils/arknights.py", "amiya/utils/recruitment.py"),
+    "embed building": ("discord/embeds.py", "amiya/cogs/", "amiya/utils/paginator.py"),
+    # The event loop waiting for worker threads or Discord, overlaps with the lookups
+    "loop idle": ("selectors.py", "of 'select.", "of '_overlapped."),
+}
+
+# Directory where the raw profiles are saved, for snakeviz or pstats, not saved if unset
+PROFILE_DIR = os.getenv("PROFILE_DIR")
+
+
+class Session:
+    """ Profiles of one command invocation """
+
+    def __init__(self):
+        self.main = cProfile.Profile()
+        # Profiles of the lookups that ran in worker threads
+        self.threads = []
+        self._lock = threading.Lock()
+        self.elapsed = 0.0
+        # Set once the command sent its response, it may keep running (e.g. paginators)
+        self.responded = asyncio.Event()
+        self.closed = False
+
+    def run(self, func: Callable, *args, **kwargs):
+        """ Runs a function under a new profiler, meant to be called from a worker thread """
+
+        if self.closed:
+            return func(*args, **kwargs)
+
+        profile = cProfile.Profile()
+        try:
+            return profile.runcall(func, *args, **kwargs)
+        finally:
+            with self._lock:
+                self.threads.append(profile)
+
+    def stats(self) -> "pstats.Stats":
+        """ Merges every profile """
+
+        # Only imported when a command was profiled
+        import pstats
+
+        stats = pstats.Stats(self.main, stream=io.StringIO())
+        with self._lock:
+            for profile in self.threads:
+                stats.add(profile)
+        return stats
+
+
+_session = ContextVar("profile_session", default=None)
+# The event loop thread can only run one profiler at a time
+running = False
+
+
+def active() -> Optional[Session]:
+    """ The profiling session of the running command, None when it isn't profiled """
+    return _session.get()
+
+
+def responded():
+    """ Stops profiling the running command once its response is sent, e.g. when a paginator displayed its first page """
+
+    session = _session.get()
+    if session is not None:
+        session.responded.set()
+
+
+async def profile(func: Callable[[], Awaitable]) -> Session:
+    """
+    Runs a coroutine function in a new task under the profiler, until it returns or responded() is called
+    Other tasks running on the event loop meanwhile are profiled as well
+
+    Args:
+        func (Callable[[], Awaitable]): The coroutine function, e.g. a command invocation
+
+    Raises:
+        RuntimeError: If another command is being profiled
+
+    Returns:
+        Session: The profiles
+    """
+
+    global running
+    if running:
+        raise RuntimeError("Another command is being profiled")
+
+    running = True
+    session = Session()
+    token = _session.set(session)
+    start = time.perf_counter()
+    session.main.enable()
+    try:
+        # The task runs in a copy of this context, so it sees the session
+        task = asyncio.ensure_future(func())
+        responded = asyncio.ensure_future(session.responded.wait())
+        await asyncio.wait([task, responded], return_when=asyncio.FIRST_COMPLETED)
+        responded.cancel()
+    finally:
+        session.main.disable()
+        session.elapsed = time.perf_counter() - start
+        session.closed = True
+        _session.reset(token)
+        running = False
+
+    if task.done():
+        task.result()
+    return session
+
+
+def categorize(stats: "pstats.Stats") -> Dict[str, float]:
+    """
+    Sums the time spent in each category, in the functions themselves (not in their callees)
+
+    Args:
+        stats (pstats.Stats): Profiling stats
+
+    Returns:
+        Dict[str, float]: A dict that maps category (or other) to seconds
+    """
+
+    totals = dict.fromkeys([*CATEGORIES, "other"], 0.0)
+    for (filename, _, name), (_, _, tottime, _, _) in stats.stats.items():
+        location = f"{filename.replace(os.sep, '/')} {name}"
+        category = next((category for category, parts in CATEGORIES.items()
+                         if any(part in location for part in parts)), "other")
+        totals[category] += tottime
+    return totals
+
+
+def report(session: Session, title: str, limit: int = 40) -> str:
+    """
+    Formats the profiles: time per category then the slowest functions
+
+    Args:
+        session (Session): The profiles
+        title (str): What was profiled
+        limit (int, optional): Number of functions listed. Defaults to 40.
+
+    Returns:
+        str: The report
+    """
+
+    stats = session.stats()
+    stream = io.StringIO()
+    stream.write(f"{title}\n{session.elapsed * 1000:.1f} ms wall time, {len(session.threads)} data lookup(s)\n\n")
+    for category, seconds in categorize(stats).items():
+        stream.write(f"{category:>16} : {seconds * 1000:9.1f} ms\n")
+    stream.write("\n")
+
+    stats.stream = stream
+    stats.sort_stats("cumulative").print_stats(limit)
+    return stream.getvalue()
+
+
+def save(session: Session, name: str, directory: str = PROFILE_DIR) -> Optional[str]:
+    """
+    Saves the merged profiles for pstats or snakeviz
+
+    Args:
+        session (Session): The profiles
+        name (str): File name, without extension
+        directory (str, optional): Directory. Defaults to PROFILE_DIR.
+
+    Returns:
+        Optional[str]: The saved file, None if no directory is set
+    """
+
+    if not directory:
+        return None
+
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{name}.prof")
+    session.stats().dump_stats(path)
+    return path
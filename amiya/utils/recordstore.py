@@ -0,0 +1,133 @@
+"""
+Memory-mapped record store
+Holds the records of a large table in one file with an offset index, records are only decoded when they are accessed
+The file is mapped read-only so that every shard process shares the same page cache
+"""
+
+import mmap
+import os
+import pickle
+import struct
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+MAGIC = b"AMIYARS1"
+# Offset of the index, stored at the end of the file
+FOOTER = struct.Struct("<Q")
+
+
+def group_records(records: Iterable[Tuple[str, Any]], group_by: str, sort_by: Optional[str] = None) -> Dict[Any, List[Tuple[str, Any]]]:
+    """
+    Groups records by the value of one of their fields
+
+    Args:
+        records (Iterable[Tuple[str, Any]]): Pairs of (key, record)
+        group_by (str): Record field whose value groups records together
+        sort_by (Optional[str], optional): Record field to sort each group by, table order is kept otherwise. Defaults to None.
+
+    Returns:
+        Dict[Any, List[Tuple[str, Any]]]: A dict that maps each group to its (key, record) pairs
+    """
+
+    groups = {}
+    for key, record in records:
+        groups.setdefault(record[group_by], []).append((key, record))
+
+    if sort_by is not None:
+        for pairs in groups.values():
+            # Stable, records with the same value keep their table order
+            pairs.sort(key=lambda x: x[1][sort_by])
+
+    return groups
+
+
+class RecordStore:
+    """ Read-only mapping of key -> record backed by a memory-mapped file """
+
+    def __init__(self, path: str):
+        """
+        Opens a record store
+
+        Args:
+            path (str): Path of a file written by `RecordStore.write`
+
+        Raises:
+            ValueError: If the file is not a record store
+        """
+
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self._mm[:len(MAGIC)] != MAGIC:
+            self._mm.close()
+            raise ValueError(f"{path} is not a record store")
+
+        (index_offset,) = FOOTER.unpack(self._mm[-FOOTER.size:])
+        self.meta, self._offsets, self._groups = pickle.loads(
+            self._mm[index_offset:-FOOTER.size])
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._offsets
+
+    def __getitem__(self, key: str) -> Any:
+        offset, length = self._offsets[key]
+        return pickle.loads(self._mm[offset:offset + length])
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self[key] if key in self._offsets else default
+
+    def keys(self) -> Iterable[str]:
+        return self._offsets.keys()
+
+    def group(self, name: str) -> List[Any]:
+        """
+        Grabs the records of a group, in the order given when writing
+
+        Args:
+            name (str): Group name (value of the field the store was grouped by)
+
+        Returns:
+            List[Any]: The decoded records, empty if the group doesn't exist
+        """
+
+        return [self[key] for key in self._groups.get(name, [])]
+
+    def close(self) -> None:
+        self._mm.close()
+
+    @staticmethod
+    def write(path: str, records: Iterable[Tuple[str, Any]], group_by: Optional[str] = None, sort_by: Optional[str] = None, meta: Any = None) -> None:
+        """
+        Writes a record store
+
+        Args:
+            path (str): Destination path
+            records (Iterable[Tuple[str, Any]]): Pairs of (key, record)
+            group_by (Optional[str], optional): Record field whose value groups records together. Defaults to None.
+            sort_by (Optional[str], optional): Record field to sort each group by. Defaults to None.
+            meta (Any, optional): Extra data stored with the index (e.g. source signature). Defaults to None.
+        """
+
+        records = list(records)
+        offsets, groups = {}, {}
+        if group_by is not None:
+            groups = {group: [key for key, _ in pairs]
+                      for group, pairs in group_records(records, group_by, sort_by).items()}
+
+        # Write then rename so that a running bot never maps a partial file
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(MAGIC)
+            for key, record in records:
+                data = pickle.dumps(record, protocol=pickle.HIGHEST_PROTOCOL)
+                offsets[key] = (f.tell(), len(data))
+                f.write(data)
+
+            index_offset = f.tell()
+            f.write(pickle.dumps((meta, offsets, groups),
+                                 protocol=pickle.HIGHEST_PROTOCOL))
+            f.write(FOOTER.pack(index_offset))
+
+        os.replace(tmp, path)
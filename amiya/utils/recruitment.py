@@ -0,0 +1,228 @@
+"""
+Recruitment tag engine
+Every recruitable operator's tags (including position, class and rarity tags) are precomputed as a bitmask over constants.TAG_LIST
+As there are only 28 tags, the operators (as a bitset over the operator list) and guaranteed minimum rarity of every combination
+of 1 to 3 tags are then precomputed too, so that a query only looks up the combinations of the offered tags
+"""
+
+from itertools import combinations
+from typing import Dict, Iterable, List, NamedTuple, Tuple
+
+from amiya.utils import constants
+
+# Tag (lowercase) -> bit
+TAG_BITS = {tag.lower(): 1 << i for i, tag in enumerate(constants.TAG_LIST)}
+TOP_OPERATOR = TAG_BITS["top operator"]
+ROBOT = TAG_BITS["robot"]
+# Largest number of tags that can be selected at once
+MAX_SELECTED = 3
+
+
+def tag_mask(tags: Iterable[str]) -> int:
+    """
+    Converts tags to a bitmask, tags that can't be recruited for are ignored
+
+    Args:
+        tags (Iterable[str]): Tags (case insensitive)
+
+    Returns:
+        int: The bitmask
+    """
+
+    mask = 0
+    for tag in tags:
+        mask |= TAG_BITS.get(tag.lower(), 0)
+    return mask
+
+
+class Recruitable(NamedTuple):
+    """ A recruitable operator """
+    name: str
+    # 0-indexed
+    rarity: int
+    # Tag list including position, profession and rarity tags
+    tags: Tuple[str, ...]
+    mask: int
+
+
+class RecruitmentEngine:
+    """ Answers which operators can be recruited with which tags """
+
+    def __init__(self, operator_table: dict, hidden_table: List[dict]):
+        """
+        Precomputes the tags of every recruitable operator
+
+        Args:
+            operator_table (dict): character_table
+            hidden_table (List[dict]): Aceship's akhr list of operators with their "hidden" flag
+        """
+
+        # As the operator_table doesn't actually show which operator we can't get from recruitment, we need Aceship's akhr file to check
+        # Even though in character_table.json there's a key named
+        # "itemOptainApproach", I don't use it to check because it's faulty (?) as
+        # Indra is supposed to be a Recruitment only operator but it shows
+        # "Recruitment & Headhunting" in her "itemOptainApproach"
+        recruitable = {x["name"] for x in hidden_table if x["hidden"] is False}
+
+        self.operators = [
+            Recruitable(x["name"], x["rarity"], tags, tag_mask(tags))
+            for x, tags in ((x, self.operator_tags(x)) for x in operator_table.values() if x["name"] in recruitable)
+        ]
+
+        # Bitsets over self.operators
+        by_tag = {bit: 0 for bit in TAG_BITS.values()}
+        by_rarity = [0] * 6
+        for i, operator in enumerate(self.operators):
+            for bit in by_tag:
+                if operator.mask & bit:
+                    by_tag[bit] |= 1 << i
+            by_rarity[operator.rarity] |= 1 << i
+        self.top_operators = by_rarity[5]
+        self.robots = by_rarity[0]
+
+        # Tag combination mask -> (operators bitset, guaranteed minimum rarity (0-indexed)), only for combinations that match operators
+        # 6* can only be obtained when "Top Operator" is selected, and 1* only at short recruitment times (not the 9:00
+        # used to get 4* or more) unless "Robot" is selected, so they don't lower the guaranteed rarity of other combinations
+        self.combinations: Dict[int, Tuple[int, int]] = {}
+        for i in range(1, MAX_SELECTED + 1):
+            for combi in combinations(by_tag, i):
+                operators = by_tag[combi[0]]
+                for bit in combi[1:]:
+                    operators &= by_tag[bit]
+                if operators == 0:
+                    continue
+
+                mask = sum(combi)
+                obtainable = self.obtainable(operators, mask)
+                # Only 1* or 6* (not obtainable) have no guaranteed rarity
+                rarity = next((rarity for rarity, bits in enumerate(by_rarity) if obtainable & bits), -1)
+                self.combinations[mask] = (operators, rarity)
+
+    def obtainable(self, operators: int, mask: int) -> int:
+        """
+        Leaves out the operators a tag combination doesn't guarantee: 6* without "Top Operator", 1* without "Robot"
+
+        Args:
+            operators (int): Bitset over self.operators
+            mask (int): Tag combination mask
+
+        Returns:
+            int: The operators counted in the guaranteed rarity
+        """
+
+        if not mask & TOP_OPERATOR:
+            operators &= ~self.top_operators
+        if not mask & ROBOT:
+            operators &= ~self.robots
+        return operators
+
+    @staticmethod
+    def operator_tags(operator: dict) -> Tuple[str, ...]:
+        """
+        Grabs every tag of an operator, as the tagList doesn't contain position, profession or rarity
+
+        Args:
+            operator (dict): Operator info from character_table
+
+        Returns:
+            Tuple[str, ...]: The tags
+        """
+
+        tags = list(operator["tagList"] or [])
+        tags.append(operator["position"].title())
+        tags.append(constants.PROFESSION_TABLE[operator["profession"]].title())
+        # Senior or Top Operator by rarity (0-indexed)
+        if operator["rarity"] == 4:
+            tags.append("Senior Operator")
+        if operator["rarity"] == 5:
+            tags.append("Top Operator")
+        return tuple(tags)
+
+    def match_any(self, tags: Iterable[str]) -> List[Recruitable]:
+        """
+        Grabs operators that have at least one of the tags, in table order
+
+        Args:
+            tags (Iterable[str]): Tags (case insensitive)
+
+        Returns:
+            List[Recruitable]: The operators
+        """
+
+        mask = tag_mask(tags)
+        return [x for x in self.operators if x.mask & mask]
+
+    def decode(self, operators: int) -> List[Recruitable]:
+        """
+        Converts an operators bitset to operators, in reverse table order
+
+        Args:
+            operators (int): Bitset over self.operators
+
+        Returns:
+            List[Recruitable]: The operators
+        """
+
+        decoded = []
+        # Only visits set bits, highest first
+        while operators:
+            i = operators.bit_length() - 1
+            decoded.append(self.operators[i])
+            operators ^= 1 << i
+        return decoded
+
+    def recruit(self, tags: List[str]) -> List[Tuple[Tuple[str, ...], List[Tuple[str, int]]]]:
+        """
+        Grabs the operators obtainable with every combination of 1 to 3 of the tags
+
+        Args:
+            tags (List[str]): Offered tags (must be in constants.TAG_LIST)
+
+        Returns:
+            List[Tuple[Tuple[str, ...], List[Tuple[str, int]]]]: A list of tuple (tag combination, list of tuple (operator name, rarity)),
+                                                                 largest combinations first, combinations without operators are left out
+        """
+
+        # Only show 6* if "Top Operator" is in query
+        hidden = 0 if tag_mask(tags) & TOP_OPERATOR else self.top_operators
+
+        results = []
+        tags_combi = [combi for i in range(1, MAX_SELECTED + 1)
+                      for combi in combinations(tags, i)][::-1]
+        for tag_combi in tags_combi:
+            operators = self.combinations.get(
+                tag_mask(tag_combi), (0, -1))[0] & ~hidden
+            if operators != 0:
+                results.append((tag_combi, [(x.name, x.rarity + 1)
+                                            for x in self.decode(operators)]))
+
+        return results
+
+    def guarantees(self, tags: List[str], min_rarity: int = 4) -> List[Tuple[Tuple[str, ...], int, List[Tuple[str, int]]]]:
+        """
+        Ranks the combinations of 1 to 3 of the tags that guarantee an operator of at least the given rarity
+
+        Args:
+            tags (List[str]): Offered tags (must be in constants.TAG_LIST)
+            min_rarity (int, optional): Lowest guaranteed rarity to show (1-indexed). Defaults to 4.
+
+        Returns:
+            List[Tuple[Tuple[str, ...], int, List[Tuple[str, int]]]]: A list of tuple (tag combination, guaranteed rarity, list of tuple (operator name, rarity)),
+                                                                      highest guaranteed rarity first then fewest tags
+        """
+
+        results = []
+        for i in range(1, MAX_SELECTED + 1):
+            for tag_combi in combinations(tags, i):
+                mask = tag_mask(tag_combi)
+                operators, rarity = self.combinations.get(mask, (0, -1))
+                if rarity + 1 < min_rarity:
+                    continue
+
+                obtainable = self.obtainable(operators, mask)
+                results.append((tag_combi, rarity + 1, [(x.name, x.rarity + 1)
+                                                        for x in self.decode(obtainable)]))
+
+        # Stable, combinations keep the order of the offered tags
+        results.sort(key=lambda x: (-x[1], len(x[0])))
+        return results
@@ -0,0 +1,192 @@
+"""
+Fuzzy search index
+Narrows a table down to a few candidates with a trigram inverted index before scoring them with Levenshtein Distance
+Other entries are only scored when an upper bound of their ratio says they could still win, so results match a full scan
+"""
+
+import heapq
+from collections import Counter, defaultdict
+from typing import Any, Iterable, List, Optional, Tuple
+
+
+def ratio(s1: str, s2: str) -> int:
+    """ fuzzywuzzy's Levenshtein Distance ratio, imported on first use as fuzzywuzzy is slow to import """
+
+    # Fuzzy String Matching, replaces this function once imported
+    global ratio
+    from fuzzywuzzy.fuzz import ratio
+    return ratio(s1, s2)
+
+
+def normalize(query: Any) -> str:
+    """
+    Normalizes a search query so that equivalent queries share a cache key
+
+    Args:
+        query (Any): The search query
+
+    Returns:
+        str: The query with surrounding and repeated whitespaces removed
+    """
+
+    # fuzzywuzzy compares the string representation of non-string inputs
+    if not isinstance(query, str):
+        query = str(query)
+
+    return " ".join(query.split())
+
+
+def trigrams(text: str) -> set:
+    """
+    Splits a string into its trigrams
+
+    Args:
+        text (str): The string to split
+
+    Returns:
+        set: A set of trigrams, padded so that short strings still have at least one
+    """
+
+    text = f"  {text.lower()} "
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class FuzzyIndex:
+    """ Trigram inverted index over the searchable keys (ID, name, code, appellation) of a table """
+
+    def __init__(self, entries: Iterable[Tuple[Any, Iterable[Optional[str]]]], limit: int = 64):
+        """
+        Builds the index
+
+        Args:
+            entries (Iterable[Tuple[Any, Iterable[Optional[str]]]]): Pairs of (value returned by search, usually the entry ID, keys to match against), in table order
+            limit (int, optional): Number of candidates scored first per query. Defaults to 64.
+        """
+
+        self.limit = limit
+        self.values: List[Any] = []
+        self.keys: List[Tuple[str, ...]] = []
+        self.postings = defaultdict(list)
+
+        for position, (value, keys) in enumerate(entries):
+            # None keys (missing name, appellation) are matched as empty strings
+            keys = tuple(key or "" for key in keys)
+            self.values.append(value)
+            self.keys.append(keys)
+            for gram in set().union(*map(trigrams, keys)):
+                self.postings[gram].append(position)
+
+        # Trigrams shared by most entries (e.g. "cha" in every "char_" ID)
+        # don't narrow anything down, they are only used if nothing else matches
+        self.common = max(len(self.values) // 4, limit)
+        self.postings = dict(self.postings)
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def candidates(self, query: str) -> List[int]:
+        """
+        Grabs positions of entries sharing the most trigrams with query
+
+        Args:
+            query (str): The search query
+
+        Returns:
+            List[int]: At most `limit` entry positions
+        """
+
+        postings = [self.postings[gram]
+                    for gram in trigrams(query) if gram in self.postings]
+        selective = [x for x in postings if len(x) <= self.common]
+
+        counter = Counter()
+        for positions in selective or postings:
+            counter.update(positions)
+
+        # Most shared trigrams first, table order to break ties
+        return heapq.nsmallest(self.limit, counter, key=lambda x: (-counter[x], x))
+
+    def score(self, position: int, query: str) -> int:
+        """ Best Levenshtein Distance ratio between query and any key of the entry """
+        return max(ratio(key, query) for key in self.keys[position])
+
+    def shared(self, query: str) -> Counter:
+        """ Number of distinct trigrams of query found in the keys of each entry, entries sharing none are left out """
+
+        counter = Counter()
+        for gram in trigrams(query):
+            counter.update(self.postings.get(gram, ()))
+        return counter
+
+    def bound(self, position: int, query: str, shared: int) -> int:
+        """
+        Upper bound of score(), without computing any Levenshtein Distance
+
+        ratio is 2 * matches / (len(key) + len(query)), where matches can't exceed the characters they have in common,
+        and the key and query differ by at least (len(key) + len(query) - 2 * matches) edits, each of them changing at most
+        3 of their padded trigrams
+
+        Args:
+            position (int): Entry position
+            query (str): The search query
+            shared (int): Trigrams of query found in the keys of the entry, counting repeated ones
+
+        Returns:
+            int: A ratio the entry can't exceed
+        """
+
+        length = len(query)
+        characters = Counter(query)
+        bound = 0
+        for key in self.keys[position]:
+            # Lowercasing may change the length, so trigrams can't bound anything
+            if length == 0 or len(key.lower()) != len(key):
+                return 100
+            # fuzzywuzzy scores empty strings 0
+            if len(key) == 0:
+                continue
+            total = len(key) + length
+            edits = max(abs(len(key) - length), -(-(len(key) + 1 - shared) // 3), -(-(length + 1 - shared) // 3))
+            if round(100 * (total - edits) / total) <= bound:
+                continue
+            # Matching characters are also limited by the characters both have in common
+            matches = min(total - edits, 2 * sum((Counter(key) & characters).values()))
+            bound = max(bound, round(100 * matches / total))
+        return bound
+
+    def search(self, query: str) -> Any:
+        """
+        Grabs the value with highest Levenshtein Distance between query and any of its keys
+
+        Args:
+            query (str): The search query
+
+        Returns:
+            Any: The matching value, the earliest one in table order on ties (same as `max`)
+        """
+
+        # fuzzywuzzy compares the string representation of non-string inputs
+        if not isinstance(query, str):
+            query = str(query)
+
+        # Lowercasing may change the length, so trigrams can't bound anything
+        if len(query.lower()) != len(query):
+            return self.values[min((-self.score(x, query), x) for x in range(len(self.values)))[1]]
+
+        candidates = self.candidates(query)
+        best = min(((-self.score(x, query), x) for x in candidates), default=(0, len(self.values)))
+
+        # Score every other entry that could beat the best candidate, or tie it earlier in table order
+        # Nothing in common or only weak matches (typically garbage input) end up scoring most of the table
+        scored = set(candidates)
+        shared = self.shared(query)
+        # Repeated trigrams of query may match more than once
+        repeated = len(query) + 1 - len(trigrams(query))
+        for x in range(len(self.values)):
+            if x in scored:
+                continue
+            bound = self.bound(x, query, shared[x] + repeated)
+            if bound > -best[0] or (bound == -best[0] and x < best[1]):
+                best = min(best, (-self.score(x, query), x))
+
+        return self.values[best[1]]
@@ -0,0 +1,186 @@
+"""
+Binary snapshots of the game data
+Parsing the large excel JSON files dominates cold start, a snapshot is a pickle of a parsed table (or of an index built from tables)
+that is only used while its source files keep the same size and modification time
+The largest tables are snapshotted as memory-mapped record stores instead (see amiya.utils.recordstore)
+"""
+
+import logging
+import os
+import pickle
+import time
+from pathlib import Path
+from typing import Any, Iterable, List, Optional, Tuple
+
+from amiya.utils.recordstore import RecordStore
+
+# Bump when the layout of snapshotted data changes
+FORMAT = 3
+
+SNAPSHOT_DIR = Path(os.getenv("SNAPSHOT_DIR", ".snapshot"))
+
+
+def signature(sources: List[str]) -> list:
+    """
+    Grabs the size and modification time of source files
+
+    Args:
+        sources (List[str]): Source file paths
+
+    Returns:
+        list: A list of (path, size, mtime) tuples
+    """
+
+    return [(source, os.stat(source).st_size, os.stat(source).st_mtime_ns) for source in sources]
+
+
+def snapshot_path(name: str, locale: str) -> Path:
+    return SNAPSHOT_DIR / locale / f"{name}.pickle"
+
+
+def records_path(name: str, locale: str) -> Path:
+    return SNAPSHOT_DIR / locale / f"{name}.records"
+
+
+def save(name: str, locale: str, sources: List[str], data: Any) -> None:
+    """
+    Writes a snapshot
+
+    Args:
+        name (str): Snapshot name
+        locale (str): Data locale
+        sources (List[str]): Files the data was built from
+        data (Any): The data
+    """
+
+    path = snapshot_path(name, locale)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    # Write then rename so that a running bot never reads a partial file
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "wb") as f:
+        pickle.dump((FORMAT, signature(sources), data),
+                    f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+
+
+def load(name: str, locale: str, sources: List[str]) -> Optional[Any]:
+    """
+    Reads a snapshot if it is still valid
+
+    Args:
+        name (str): Snapshot name
+        locale (str): Data locale
+        sources (List[str]): Files the data was built from
+
+    Returns:
+        Optional[Any]: The data, None if the snapshot is missing, unreadable or older than its sources
+    """
+
+    path = snapshot_path(name, locale)
+    if not path.exists():
+        return None
+
+    try:
+        with open(path, "rb") as f:
+            version, sources_signature, data = pickle.load(f)
+    except Exception:
+        logging.warning(f"Ignoring unreadable snapshot {path}")
+        return None
+
+    if version != FORMAT or sources_signature != signature(sources):
+        logging.info(f"Ignoring stale snapshot {path}")
+        return None
+
+    return data
+
+
+def save_records(name: str, locale: str, sources: List[str], records: Iterable[Tuple[str, Any]], group_by: Optional[str] = None, sort_by: Optional[str] = None) -> None:
+    """
+    Writes a record store snapshot
+
+    Args:
+        name (str): Snapshot name
+        locale (str): Data locale
+        sources (List[str]): Files the records were read from
+        records (Iterable[Tuple[str, Any]]): Pairs of (key, record)
+        group_by (Optional[str], optional): Record field whose value groups records together. Defaults to None.
+        sort_by (Optional[str], optional): Record field to sort each group by. Defaults to None.
+    """
+
+    path = records_path(name, locale)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    RecordStore.write(str(path), records, group_by, sort_by,
+                      meta=(FORMAT, signature(sources)))
+
+
+def load_records(name: str, locale: str, sources: List[str]) -> Optional[RecordStore]:
+    """
+    Opens a record store snapshot if it is still valid
+
+    Args:
+        name (str): Snapshot name
+        locale (str): Data locale
+        sources (List[str]): Files the records were read from
+
+    Returns:
+        Optional[RecordStore]: The store, None if it is missing, unreadable or older than its sources
+    """
+
+    path = records_path(name, locale)
+    if not path.exists():
+        return None
+
+    try:
+        store = RecordStore(str(path))
+    except Exception:
+        logging.warning(f"Ignoring unreadable record store {path}")
+        return None
+
+    if store.meta != (FORMAT, signature(sources)):
+        logging.info(f"Ignoring stale record store {path}")
+        store.close()
+        return None
+
+    return store
+
+
+def build(locale: str) -> None:
+    """
+    Compiles every excel table (the game constants included) and fuzzy index of a locale into snapshots
+
+    Args:
+        locale (str): Data locale
+    """
+
+    # Imported here as arknights loads its data through this module
+    from amiya.utils import arknights
+
+    start = time.perf_counter()
+
+    for name in arknights.TABLES:
+        path = arknights.table_path(name, locale)
+        table = arknights.read_json(path)
+
+        # Large tables are served from the record stores of their records
+        table_stores = {store: spec for store, spec in arknights.RECORD_STORES.items()
+                        if spec[0] == name}
+        for store, (_, records, group_by, sort_by) in table_stores.items():
+            save_records(store, locale, [path],
+                         records(table).items(), group_by, sort_by)
+            logging.info(
+                f"Compiled {store} records from {name} ({os.path.getsize(records_path(store, locale)) / 1024:.0f} KiB)")
+
+        if len(table_stores) == 0:
+            save(name, locale, [path], table)
+            logging.info(
+                f"Compiled {name} ({os.path.getsize(snapshot_path(name, locale)) / 1024:.0f} KiB)")
+
+    for name, (table_name, builder) in arknights.INDEXES.items():
+        path = arknights.table_path(table_name, locale)
+        save(f"{name}_index", locale, [path],
+             builder(arknights.read_json(path)))
+        logging.info(f"Compiled {name} index")
+
+    logging.info(
+        f"Snapshots written to {SNAPSHOT_DIR / locale} in {time.perf_counter() - start:.1f} s")
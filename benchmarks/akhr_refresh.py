@@ -0,0 +1,113 @@
+"""
+Checks the akhr.json refresh against a local stand-in server, so that nothing leaves the machine
+    first fetch  : no cache, the data is downloaded and cached with its ETag
+    304 reuse    : the cache is revalidated, the server answers 304 and the cached data is kept
+    timeout      : the server never answers, the refresh gives up after AKHR_TIMEOUT and no request keeps running
+    404          : the refresh fails and the previous data is kept
+    refused      : nothing listens, the refresh fails and the previous data is kept
+Run from the repository root: python -m benchmarks.akhr_refresh
+"""
+
+import asyncio
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from aiohttp import web
+
+from amiya.utils import akhr, arknights, http_client
+
+HOST, PORT = "127.0.0.1", 8767
+# Nothing listens on this port
+CLOSED_PORT = 8768
+ETAG = '"akhr-1"'
+BODY = json.dumps([{"name": f"Operator {i}", "hidden": i % 3 == 0} for i in range(300)])
+# Seconds, short so that the checks run quickly
+TIMEOUT = 0.5
+
+
+async def serve(stats: dict) -> web.AppRunner:
+    async def handler(request):
+        stats["requests"] += 1
+        stats["in_flight"] += 1
+        try:
+            name = request.match_info["name"]
+            if name == "slow":
+                await asyncio.sleep(3600)
+            if name == "missing":
+                return web.Response(status=404)
+            if request.headers.get("If-None-Match") == ETAG:
+                return web.Response(status=304)
+            return web.Response(text=BODY, headers={"ETag": ETAG})
+        finally:
+            # Also reached when the client hangs up
+            stats["in_flight"] -= 1
+
+    app = web.Application()
+    app.router.add_get("/{name}.json", handler)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, HOST, PORT).start()
+    return runner
+
+
+async def check(name: str, url: str, path: Path, stats: dict, expected: bool, force: bool = True) -> bool:
+    """ Refreshes from url, then checks the result, the time it took and that no request is left running """
+
+    requests = stats["requests"]
+    previous = arknights.hidden_table
+    start = time.perf_counter()
+    result = await akhr.refresh(force=force, url=url, path=path)
+    elapsed = time.perf_counter() - start
+
+    # A request still running would reach the server again or stay open
+    await asyncio.sleep(TIMEOUT * 2)
+    problems = []
+    if result is not expected:
+        problems.append(f"returned {result}")
+    if elapsed > TIMEOUT * 2:
+        problems.append(f"took {elapsed:.2f} s")
+    if stats["in_flight"] > 0 or len(http_client.client._in_flight) > 0:
+        problems.append("a request is still running")
+    if not expected and arknights.hidden_table is not previous:
+        problems.append("the previous data was dropped")
+
+    print(f"{name:>12} : {'ok' if not problems else ', '.join(problems)} "
+          f"({elapsed * 1000:.0f} ms, {stats['requests'] - requests} request(s) served)")
+    return not problems
+
+
+async def main():
+    akhr.TIMEOUT = TIMEOUT
+    http_client.client.retry_backoff = 0.05
+    stats = {"requests": 0, "in_flight": 0}
+    runner = await serve(stats)
+
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory, "akhr.json")
+        base = f"http://{HOST}:{PORT}"
+
+        results.append(await check("first fetch", f"{base}/akhr.json", path, stats, True, force=False))
+        results.append(akhr.read_cache(path)["etag"] == ETAG)
+
+        data = arknights.hidden_table
+        results.append(await check("304 reuse", f"{base}/akhr.json", path, stats, True))
+        # The same data is still served
+        results.append(arknights.hidden_table == data)
+
+        results.append(await check("timeout", f"{base}/slow.json", path, stats, False))
+        results.append(await check("404", f"{base}/missing.json", path, stats, False))
+        results.append(await check("refused", f"http://{HOST}:{CLOSED_PORT}/akhr.json", path, stats, False))
+
+    await http_client.client.close()
+    await runner.cleanup()
+
+    print(f"{results.count(False)} failure(s)")
+    sys.exit(1 if False in results else 0)
+
+
+if __name__ == "__main__":
+    asyncio.get_event_loop().run_until_complete(main())
@@ -0,0 +1,48 @@
+"""
+Compares cold start (every table, index and constant loaded in a fresh process) from JSON and from snapshots
+Run from the repository root after `python -m amiya snapshot`: python -m benchmarks.cold_start
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+
+# Runs in a fresh interpreter so that nothing is cached
+LOAD = """
+import time
+from amiya.utils import arknights, constants
+start = time.perf_counter()
+constants.setup()
+arknights.warm_up()
+print(time.perf_counter() - start)
+"""
+
+
+def cold_start(snapshot_dir: str) -> float:
+    env = dict(os.environ, SNAPSHOT_DIR=snapshot_dir, PYTHONWARNINGS="ignore")
+    output = subprocess.run([sys.executable, "-c", LOAD], env=env,
+                            check=True, stdout=subprocess.PIPE, universal_newlines=True).stdout
+    return float(output.split()[-1])
+
+
+def main(runs: int = 5):
+    snapshot_dir = os.getenv("SNAPSHOT_DIR", ".snapshot")
+    if not os.path.isdir(snapshot_dir):
+        sys.exit("No snapshot found, run `python -m amiya snapshot` first")
+
+    results = {
+        # A missing directory disables snapshots
+        "JSON": [cold_start(os.path.join(snapshot_dir, "missing")) for _ in range(runs)],
+        "snapshot": [cold_start(snapshot_dir) for _ in range(runs)],
+    }
+
+    for source, timings in results.items():
+        print(
+            f"{source:>8} : median {statistics.median(timings) * 1000:.0f} ms, min {min(timings) * 1000:.0f} ms over {runs} runs")
+    print(
+        f"Speedup : {statistics.median(results['JSON']) / statistics.median(results['snapshot']):.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Checks that the trigram indexes return the same best match as a full Levenshtein scan
+Run from the repository root: python -m benchmarks.fuzzy_equivalence
+"""
+
+import json
+import sys
+import time
+from pathlib import Path
+
+# Fuzzy String Matching
+from fuzzywuzzy.fuzz import ratio
+
+from amiya.utils import arknights
+
+
+def full_scan(entries: list, query: str):
+    """ The original lookup: highest ratio between query and any key, first entry wins on ties """
+    return max(entries, key=lambda x: max(ratio(key or "", query) for key in x[1]))[0]
+
+
+def main():
+    with open(Path(__file__).parent / "corpus.json", "r", encoding="UTF-8") as f:
+        corpus = json.load(f)
+
+    # Build every index
+    indexes = {table: arknights.pinned().load_index(table) for table in corpus}
+
+    mismatches = 0
+    for table, queries in corpus.items():
+        index = indexes[table]
+        entries = list(zip(index.values, index.keys))
+
+        start = time.perf_counter()
+        expected = [full_scan(entries, query) for query in queries]
+        scan_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        actual = [index.search(query) for query in queries]
+        index_time = time.perf_counter() - start
+
+        for query, x, y in zip(queries, expected, actual):
+            if x != y:
+                mismatches += 1
+                print(f"[{table}] {query!r}: expected {index.keys[index.values.index(x)]}, got {index.keys[index.values.index(y)]}")
+
+        print(
+            f"[{table}] {len(index)} entries, {len(queries)} queries : full scan {scan_time * 1000 / len(queries):.2f} ms/query, index {index_time * 1000 / len(queries):.2f} ms/query")
+
+    print(f"{mismatches} mismatch(es)")
+    sys.exit(1 if mismatches > 0 else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Compares the previous blocking fetch (requests.get in a thread pool, no session) with the pooled HTTP client under concurrent load
+Serves a JSON file from a local stand-in server with some latency, so that nothing leaves the machine
+Run from the repository root: python -m benchmarks.http_client
+"""
+
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from aiohttp import web
+
+from amiya.utils.http_client import HTTPClient
+
+HOST, PORT = "127.0.0.1", 8766
+# Seconds the server takes to answer
+LATENCY = 0.02
+REQUESTS = 400
+# Distinct urls, concurrent requests to the same url share one
+URLS = 20
+BODY = json.dumps([{"name": f"Operator {i}", "hidden": i % 3 == 0} for i in range(300)])
+
+
+async def serve(stats: dict) -> web.AppRunner:
+    async def handler(request):
+        stats["requests"] += 1
+        # Each new client port is a new connection
+        stats["connections"].add(request.transport.get_extra_info("peername"))
+        await asyncio.sleep(LATENCY)
+        return web.Response(text=BODY)
+
+    app = web.Application()
+    app.router.add_get("/{name}.json", handler)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, HOST, PORT).start()
+    return runner
+
+
+def urls(distinct: int = URLS) -> list:
+    return [f"http://{HOST}:{PORT}/{i % distinct}.json" for i in range(REQUESTS)]
+
+
+async def blocking_fetch(loop: asyncio.AbstractEventLoop) -> None:
+    # The previous arknights.fetch, offloaded as the data commands are
+    def fetch(url):
+        return requests.get(url).json()
+
+    with ThreadPoolExecutor(4) as executor:
+        await asyncio.gather(*[loop.run_in_executor(executor, fetch, url) for url in urls()])
+
+
+async def pooled_fetch(loop: asyncio.AbstractEventLoop) -> None:
+    client = HTTPClient()
+    try:
+        await asyncio.gather(*[client.get_json(url) for url in urls()])
+    finally:
+        await client.close()
+
+
+async def pooled_fetch_distinct(loop: asyncio.AbstractEventLoop) -> None:
+    # Without deduplication, only pooling helps
+    client = HTTPClient()
+    try:
+        await asyncio.gather(*[client.get_json(url) for url in urls(REQUESTS)])
+    finally:
+        await client.close()
+
+
+async def main():
+    loop = asyncio.get_event_loop()
+    for name, run in [("requests.get", blocking_fetch), ("HTTPClient", pooled_fetch),
+                      ("HTTPClient (distinct urls)", pooled_fetch_distinct)]:
+        stats = {"requests": 0, "connections": set()}
+        runner = await serve(stats)
+        start = time.perf_counter()
+        await run(loop)
+        elapsed = time.perf_counter() - start
+        await runner.cleanup()
+
+        print(f"{name:>26} : {elapsed * 1000:.0f} ms for {REQUESTS} fetches, "
+              f"{stats['requests']} requests served over {len(stats['connections'])} connections")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,43 @@
+"""
+Compares the memory cost of serving several locales with and without sharing their identical table parts
+Run from the repository root with the locales to compare: LOCALES=zh-CN,ja-JP,ko-KR python -m benchmarks.locale_memory
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+# Runs in a fresh interpreter, prints the memory report and the RSS (KiB) once every locale is loaded
+LOAD = """
+import json
+from amiya.utils import arknights
+arknights.warm_up()
+with open("/proc/self/status") as f:
+    rss = next(int(line.split()[1]) for line in f if line.startswith("VmRSS"))
+print(json.dumps({"report": arknights.memory_report(), "rss": rss}))
+"""
+
+
+def load(share: bool) -> dict:
+    env = dict(os.environ, SHARE_LOCALES=str(share).lower(), PYTHONWARNINGS="ignore")
+    output = subprocess.run([sys.executable, "-c", LOAD], env=env,
+                            check=True, stdout=subprocess.PIPE, universal_newlines=True).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def main():
+    if not os.getenv("LOCALES"):
+        sys.exit("Set LOCALES to the locales to load besides en-US, e.g. LOCALES=zh-CN,ja-JP")
+
+    for share in (False, True):
+        result = load(share)
+        print(f"Sharing {'on' if share else 'off'} : RSS {result['rss'] / 1024:.1f} MiB")
+        for name, memory in result["report"].items():
+            print(f"  {name:>5} : {memory['standalone'] / 2 ** 20:6.1f} MiB alone, +{memory['added'] / 2 ** 20:6.1f} MiB added")
+        print(f"  Total : {sum(x['added'] for x in result['report'].values()) / 2 ** 20:.1f} MiB "
+              f"for {len(result['report'])} locales ({sum(x['standalone'] for x in result['report'].values()) / 2 ** 20:.1f} MiB loaded separately)")
+
+
+if __name__ == "__main__":
+    main()
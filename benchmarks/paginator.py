@@ -0,0 +1,88 @@
+"""
+Measures the cost of one page flip against the number of pages
+The previous paginator deep-copied and renumbered every page on each flip, pages are now rendered and numbered when first displayed,
+and only the displayed page and its neighbors are kept
+Run from the repository root: python -m benchmarks.paginator
+"""
+
+import functools
+import time
+from copy import deepcopy
+
+import discord
+
+from amiya.utils.paginator import EmbedPaginator
+
+PAGE_COUNTS = [1, 5, 10, 25, 50, 100]
+FLIPS = 200
+
+
+def make_page(i: int) -> discord.Embed:
+    # About the size of an operator file or skin page
+    page = discord.Embed(title=f"Page {i}", description="Lorem ipsum dolor sit amet " * 40)
+    for j in range(5):
+        page.add_field(name=f"Field {j}", value="Consectetur adipiscing elit " * 20, inline=False)
+    page.set_image(url=f"https://example.com/{i}.png")
+    if i % 2 == 0:
+        page.set_footer(text="Footer", icon_url="https://example.com/icon.png")
+    return page
+
+
+def make_pages(count: int) -> list:
+    return [make_page(i) for i in range(count)]
+
+
+def previous_formatted_pages(pages: list) -> list:
+    # The previous EmbedPaginator.formatted_pages property
+    pages = deepcopy(pages)
+    for page in pages:
+        if page.footer.text == discord.Embed.Empty:
+            page.set_footer(text=f"({pages.index(page)+1}/{len(pages)})")
+        else:
+            if page.footer.icon_url == discord.Embed.Empty:
+                page.set_footer(
+                    text=f"{page.footer.text} - ({pages.index(page)+1}/{len(pages)})")
+            else:
+                page.set_footer(
+                    icon_url=page.footer.icon_url,
+                    text=f"{page.footer.text} - ({pages.index(page)+1}/{len(pages)})",
+                )
+    return pages
+
+
+def main():
+    print(f"{'pages':>6} {'previous flip':>14} {'flip':>10} {'first page':>11}")
+    for count in PAGE_COUNTS:
+        pages = make_pages(count)
+
+        start = time.perf_counter()
+        for i in range(FLIPS):
+            previous_formatted_pages(pages)[i % count]
+        previous = (time.perf_counter() - start) / FLIPS
+
+        # Rendered on demand, as the operator commands do
+        start = time.perf_counter()
+        paginator = EmbedPaginator(None, [functools.partial(make_page, i) for i in range(count)])
+        paginator.page(0)
+        first_page = time.perf_counter() - start
+        paginator.prefetch(0)
+
+        # Alternate forward flips and jumps to the first page, as run() does
+        start = time.perf_counter()
+        for i in range(FLIPS):
+            index = i % count if i % 4 else 0
+            paginator.page(index)
+            paginator.prefetch(index)
+        flip = (time.perf_counter() - start) / FLIPS
+
+        # Same pages as before (a single page isn't numbered), and the given pages are left as is
+        paginator = EmbedPaginator(None, pages)
+        expected = previous_formatted_pages(pages) if count > 1 else pages
+        assert [paginator.page(i).to_dict() for i in range(count)] == [x.to_dict() for x in expected]
+        assert [x.to_dict() for x in pages] == [x.to_dict() for x in make_pages(count)]
+
+        print(f"{count:>6} {previous * 1000:>11.3f} ms {flip * 1000:>7.3f} ms {first_page * 1000:>8.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Load test of the reaction router with thousands of running paginators
+Compares dispatching reactions through discord.py wait_for checks, as every paginator used to wait for its reactions,
+with the router matching them by message ID, then checks that sessions beyond the cap are closed
+Nothing connects to Discord, messages and reactions are stand-ins
+Run from the repository root: python -m benchmarks.reaction_router
+"""
+
+import asyncio
+import random
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+import discord
+
+from amiya.utils import paginator
+
+PAGINATORS = [100, 1000, 5000]
+REACTIONS = 2000
+CONTROLS = ("⏮", "◀", "▶", "⏭", "⏹")
+BOT = SimpleNamespace(id=-1)
+
+
+class Message:
+    def __init__(self, id: int):
+        self.id = id
+        self.channel = self
+
+    async def send(self, embed=None):
+        return self
+
+    async def add_reaction(self, emoji):
+        await asyncio.sleep(0)
+
+    async def edit(self, embed=None):
+        pass
+
+    async def remove_reaction(self, emoji, user):
+        pass
+
+    async def clear_reactions(self):
+        pass
+
+    async def delete(self):
+        pass
+
+
+def reactions(count: int) -> list:
+    # Users flipping the pages of their paginator, user i runs paginator i
+    return [(SimpleNamespace(message=SimpleNamespace(id=message_id), emoji=random.choice(CONTROLS[1:3])),
+             SimpleNamespace(id=message_id))
+            for message_id in (random.randrange(count) for _ in range(REACTIONS))]
+
+
+async def previous_dispatch(count: int) -> float:
+    # The previous EmbedPaginator.run check, one wait_for per paginator
+    client = discord.Client(loop=asyncio.get_event_loop())
+    events = reactions(count)
+
+    def waiter(message_id):
+        def check(r, u):
+            return r.message.id == message_id and r.emoji in CONTROLS and u.id in [u1.id for u1 in [SimpleNamespace(id=message_id)]]
+        return client.wait_for("reaction_add", check=check, timeout=600)
+
+    waiters = [asyncio.ensure_future(waiter(i)) for i in range(count)]
+    await asyncio.sleep(0)
+
+    start = time.perf_counter()
+    for reaction, user in events:
+        client.dispatch("reaction_add", reaction, user)
+    elapsed = time.perf_counter() - start
+
+    for task in waiters:
+        task.cancel()
+    await asyncio.gather(*waiters, return_exceptions=True)
+    await client.close()
+    return elapsed / REACTIONS
+
+
+async def run_paginators(count: int, router: paginator.ReactionRouter) -> list:
+    paginator.router = router
+    client = SimpleNamespace(user=BOT)
+    tasks = []
+    for i in range(count):
+        pgnt = paginator.EmbedPaginator(client, [discord.Embed(title=str(x)) for x in range(3)], Message(i))
+        tasks.append(asyncio.ensure_future(pgnt.run([SimpleNamespace(id=i)])))
+    # Let every paginator send its first page and open its session
+    for _ in range(5):
+        await asyncio.sleep(0)
+    return tasks
+
+
+async def router_dispatch(count: int) -> tuple:
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    router = paginator.ReactionRouter(count)
+    tasks = await run_paginators(count, router)
+    memory = (tracemalloc.get_traced_memory()[0] - before) / count
+    tracemalloc.stop()
+
+    events = reactions(count)
+    start = time.perf_counter()
+    for reaction, user in events:
+        await router.on_reaction_add(reaction, user)
+    elapsed = time.perf_counter() - start
+
+    # Let the paginators flip their pages
+    for _ in range(5):
+        await asyncio.sleep(0)
+    assert router.dispatched == REACTIONS
+
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    assert len(router) == 0
+    return elapsed / REACTIONS, memory
+
+
+async def cap(count: int, max_sessions: int) -> None:
+    router = paginator.ReactionRouter(max_sessions)
+    tasks = await run_paginators(count, router)
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+    # The oldest paginators were closed, the others still run
+    closed = sum(task.done() for task in tasks)
+    print(f"{count} paginators with a cap of {max_sessions}: {len(router)} running, {router.evictions} evicted, {closed} closed")
+    assert closed == router.evictions == count - max_sessions
+    assert all(task.done() for task in tasks[:count - max_sessions])
+
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def main():
+    print(f"{'paginators':>10} {'wait_for':>12} {'router':>12} {'per session':>12}")
+    for count in PAGINATORS:
+        previous = await previous_dispatch(count)
+        routed, memory = await router_dispatch(count)
+        print(f"{count:>10} {previous * 1e6:>9.1f} us {routed * 1e6:>9.1f} us {memory / 1024:>9.1f} KiB")
+
+    await cap(5000, 1000)
+
+
+if __name__ == "__main__":
+    random.seed(0)
+    asyncio.get_event_loop().run_until_complete(main())
@@ -0,0 +1,58 @@
+"""
+Compares the memory of a process serving operator files, audio and skins from JSON tables and from memory-mapped record stores
+Run from the repository root after `python -m amiya snapshot` (Linux only): python -m benchmarks.record_store_rss
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+# Runs in a fresh interpreter, prints RSS and private memory (KiB) after serving a few operators
+SERVE = """
+import json
+from amiya.utils import arknights
+for operator in ["amiya", "texas", "exusiai", "silverash", "angelina"]:
+    arknights.get_operator_file(operator)
+    arknights.get_operator_audio(operator)
+    arknights.get_operator_skins(operator)
+memory = {}
+with open("/proc/self/smaps_rollup") as f:
+    for line in f:
+        key, _, value = line.partition(":")
+        if key in ("Rss", "Shared_Clean", "Private_Clean", "Private_Dirty"):
+            memory[key] = int(value.split()[0])
+print(json.dumps(memory))
+"""
+
+
+def serve(snapshot_dir: str) -> dict:
+    env = dict(os.environ, SNAPSHOT_DIR=snapshot_dir, PYTHONWARNINGS="ignore")
+    output = subprocess.run([sys.executable, "-c", SERVE], env=env,
+                            check=True, stdout=subprocess.PIPE, universal_newlines=True).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def main():
+    snapshot_dir = os.getenv("SNAPSHOT_DIR", ".snapshot")
+    if not os.path.isdir(snapshot_dir):
+        sys.exit("No snapshot found, run `python -m amiya snapshot` first")
+
+    results = {
+        # A missing directory disables snapshots
+        "JSON": serve(os.path.join(snapshot_dir, "missing")),
+        "records": serve(snapshot_dir),
+    }
+
+    for source, memory in results.items():
+        private = memory["Private_Clean"] + memory["Private_Dirty"]
+        print(
+            f"{source:>7} : RSS {memory['Rss'] / 1024:.1f} MiB, private {private / 1024:.1f} MiB, shared page cache {memory['Shared_Clean'] / 1024:.1f} MiB")
+
+    saved = sum(results["JSON"][x] - results["records"][x]
+                for x in ("Private_Clean", "Private_Dirty"))
+    print(f"Private memory saved per shard process : {saved / 1024:.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
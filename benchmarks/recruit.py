@@ -0,0 +1,121 @@
+"""
+Compares `;recruit` with 5 tags between the previous set-based matching and the precomputed bitset engine, and times `;recruit +g`
+Run from the repository root: python -m benchmarks.recruit [path to akhr.json]
+akhr.json is fetched from Aceship's repository when no path is given
+"""
+
+import asyncio
+import json
+import sys
+import timeit
+from itertools import combinations
+
+from amiya.utils import akhr, arknights, constants, http_client
+from amiya.utils.recruitment import RecruitmentEngine
+
+QUERIES = [
+    ["Top Operator", "Senior Operator", "Crowd Control", "Defense", "Melee"],
+    ["Guard", "Ranged", "DPS", "Survival", "AoE"],
+    ["Medic", "Healing", "Support", "Ranged", "Starter"],
+    ["Specialist", "Fast-Redeploy", "Shift", "Slow", "Debuff"],
+    ["Specialist", "Nuker", "Support", "Healing", "Robot"],
+]
+
+
+def baseline(operator_table: dict, hidden_table: list, tags: list) -> list:
+    """ The previous implementation (get_operator_by_tags then the cog loop), without its tagList mutation """
+
+    lowered = [x.lower() for x in tags]
+    hidden_list = [{x["name"]: x["hidden"]} for x in hidden_table]
+    operator_list = [
+        {"name": x["name"], "position": x["position"], "tagList": list(x["tagList"] or []),
+         "rarity": x["rarity"], "profession": x["profession"]}
+        for x in operator_table.values()
+        if (
+            (x["tagList"] is not None and (set([i.lower() for i in x["tagList"]]) & set(lowered)))
+            or x["position"].lower() in lowered
+            or constants.PROFESSION_TABLE[x["profession"]].lower() in lowered
+            or ("senior operator" in lowered and x["rarity"] == 4)
+            or ("top operator" in lowered and x["rarity"] == 5)
+        )
+        and {x["name"]: False} in hidden_list
+    ]
+    for operator in operator_list:
+        operator["tagList"].append(operator.pop("position").title())
+        operator["tagList"].append(
+            constants.PROFESSION_TABLE[operator.pop("profession")].title())
+        if operator["rarity"] == 4:
+            operator["tagList"].append("Senior Operator")
+        if operator["rarity"] == 5:
+            operator["tagList"].append("Top Operator")
+
+    tags_combi = [list(combi) for i in range(1, 4)
+                  for combi in combinations(tags, i)][::-1]
+    results = []
+    for tag_combi in tags_combi:
+        match_list = [
+            (operator["name"], operator["rarity"] + 1)
+            for operator in operator_list
+            if set(tag_combi).issubset(set(operator["tagList"]))
+            and not ("Top Operator" not in tags and "Top Operator" in operator["tagList"])
+        ][::-1]
+        if len(match_list) > 0:
+            results.append((tuple(tag_combi), match_list))
+    return results
+
+
+def baseline_guarantees(results: list, min_rarity: int = 1) -> list:
+    """ Guaranteed rarity of every combination listed by ;recruit, 1* only count with "Robot" and 6* with "Top Operator" """
+
+    guarantees = []
+    for tag_combi, operators in results:
+        obtainable = [(name, rarity) for name, rarity in operators
+                      if (rarity != 1 or "Robot" in tag_combi) and (rarity != 6 or "Top Operator" in tag_combi)]
+        rarity = min((rarity for _, rarity in obtainable), default=0)
+        if rarity >= min_rarity:
+            guarantees.append((tag_combi, rarity, obtainable))
+    return guarantees
+
+
+async def fetch_hidden_table() -> list:
+    client = http_client.HTTPClient()
+    try:
+        return await client.get_json(akhr.URL)
+    finally:
+        await client.close()
+
+
+def main():
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], encoding="utf-8") as f:
+            hidden_table = json.load(f)
+    else:
+        hidden_table = asyncio.run(fetch_hidden_table())
+    operator_table = arknights.pinned().load_table("character_table")
+    engine = RecruitmentEngine(operator_table, hidden_table)
+
+    for tags in QUERIES:
+        results = engine.recruit(tags)
+        assert results == baseline(operator_table, hidden_table, tags), tags
+        # Robots only show up at short recruitment times, they don't lower the guaranteed rarity of e.g. Specialist or Nuker
+        assert sorted(engine.guarantees(tags, 1)) == sorted(baseline_guarantees(results)), tags
+
+    runs = 50
+    old = timeit.timeit(lambda: [baseline(operator_table, hidden_table, tags) for tags in QUERIES],
+                        number=runs) / (runs * len(QUERIES))
+    new = timeit.timeit(lambda: [engine.recruit(tags) for tags in QUERIES],
+                        number=runs) / (runs * len(QUERIES))
+
+    print(f"Recruitable operators : {len(engine.operators)}")
+    print(f"   sets : {old * 1000:.3f} ms per 5-tag query")
+    print(f" bitset : {new * 1000:.3f} ms per 5-tag query")
+    print(f"Speedup : {old / new:.1f}x")
+
+    guarantees = timeit.timeit(lambda: [engine.guarantees(tags) for tags in QUERIES],
+                               number=runs) / (runs * len(QUERIES))
+    print(
+        f"Guarantees : {guarantees * 1000000:.0f} us per 5-tag query ({len(engine.combinations)} precomputed combinations)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Startup of the bot, in a fresh process, without connecting to Discord
+    import  : python -X importtime breakdown of the bot and its cogs, per package and per amiya module
+    connect : time until the gateway connection can start
+    ready   : time until every cog and the game data are loaded
+Run from the repository root: python -m benchmarks.startup [--output results.json] [--runs 5]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+COGS = ["amiya.cogs.general", "amiya.cogs.guides", "amiya.cogs.operator", "amiya.cogs.owner"]
+
+# Runs in a fresh interpreter so that nothing is imported
+STARTUP = """
+import time
+start = time.perf_counter()
+import asyncio
+from discord.ext import commands
+import amiya.__main__ as amiya_main
+loop = asyncio.get_event_loop()
+bot = commands.Bot(command_prefix="!", loop=loop)
+connect = time.perf_counter() - start
+loop.run_until_complete(amiya_main.initialize(bot))
+print(connect, time.perf_counter() - start)
+"""
+
+
+def import_times() -> dict:
+    """
+    Imports the bot and its cogs under python -X importtime
+
+    Returns:
+        dict: A dict that maps module name to its (self, cumulative) import time in milliseconds
+    """
+
+    code = "; ".join(f"import {module}" for module in ["amiya.__main__", *COGS])
+    stderr = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                            env=dict(os.environ, PYTHONWARNINGS="ignore"), check=True,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, universal_newlines=True).stderr
+
+    times = {}
+    for line in stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|")
+        times[name.strip()] = (int(own) / 1000, int(cumulative) / 1000)
+    return times
+
+
+def breakdown(times: dict) -> dict:
+    """ Sums the self import time per top-level package, amiya per module """
+
+    totals = defaultdict(float)
+    for name, (own, _) in times.items():
+        totals[name if name.startswith("amiya.") else name.split(".")[0]] += own
+    return dict(sorted(totals.items(), key=lambda x: -x[1]))
+
+
+def startup() -> tuple:
+    output = subprocess.run([sys.executable, "-c", STARTUP],
+                            env=dict(os.environ, PYTHONWARNINGS="ignore", WARM_UP="true", DATA_WATCH_INTERVAL="0"),
+                            check=True, stdout=subprocess.PIPE, universal_newlines=True).stdout
+    connect, ready = output.split()[-2:]
+    return float(connect), float(ready)
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.startup")
+    parser.add_argument("--output", help="JSON results file")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh processes started (default: 5)")
+    parser.add_argument("--limit", type=int, default=15, help="Packages listed (default: 15)")
+    args = parser.parse_args()
+
+    packages = breakdown(import_times())
+    runs = [startup() for _ in range(args.runs)]
+    results = {
+        "import": packages,
+        "import_total": sum(packages.values()),
+        "connect": statistics.median(connect for connect, _ in runs) * 1000,
+        "ready": statistics.median(ready for _, ready in runs) * 1000,
+    }
+
+    for name, milliseconds in list(packages.items())[:args.limit]:
+        print(f"{name:>32} : {milliseconds:7.1f} ms")
+    print(f"{'import total':>32} : {results['import_total']:7.1f} ms")
+    print(f"{'connect':>32} : {results['connect']:7.1f} ms (median over {args.runs} runs)")
+    print(f"{'ready':>32} : {results['ready']:7.1f} ms (median over {args.runs} runs)")
+
+    if args.output is not None:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,330 @@
+"""
+Benchmark suite of the arknights resolvers and of the embed rendering of every cog command, offline against the checked-out ArknightsData
+Resolvers are timed on the recorded queries of corpus.json:
+    load : first query of a fresh process, loading the tables and indexes it needs
+    cold : tables loaded, query and render caches cleared before each query
+    warm : every cache filled
+Commands are timed end to end with a fake Context, until their (first) embed is sent
+Recruitment is only benchmarked when akhr.json is available, from --akhr or the bot's disk cache
+Run from the repository root: python -m benchmarks.suite [--output results.json] [--compare previous.json]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+from amiya.utils import akhr, arknights, constants
+
+# Recorded ;recruit queries
+TAG_QUERIES = [
+    ["Top Operator", "Senior Operator", "Crowd Control", "Defense", "Melee"],
+    ["Guard", "Ranged", "DPS", "Survival", "AoE"],
+    ["Medic", "Healing", "Support", "Ranged", "Starter"],
+    ["Specialist", "Fast-Redeploy", "Shift", "Slow", "Debuff"],
+    ["Caster", "Nuker", "Senior Operator"],
+    ["Vanguard", "DP-Recovery"],
+    ["Robot", "Support"],
+    ["Defender", "Healing", "Defense"],
+]
+
+# Resolver -> (corpus, function of a query)
+RESOLVERS = {
+    "get_operator_info": ("operator", arknights.get_operator_info),
+    "get_item": ("item", arknights.get_item),
+    "get_stage": ("stage", arknights.get_stage),
+    "get_stage_with_item": ("item_id", arknights.get_stage_with_item),
+    "get_operator_by_tags": ("tags", arknights.get_operator_by_tags),
+    "get_enemy": ("enemy", arknights.get_enemy),
+    "get_furniture": ("furniture", arknights.get_furniture),
+}
+
+# Runs in a fresh interpreter so that nothing is loaded
+LOAD = """
+import json, sys, time
+from amiya.utils import constants
+from benchmarks import suite
+constants.setup()
+name, query, akhr_path = sys.argv[1], json.loads(sys.argv[2]), sys.argv[3]
+if name == "get_operator_by_tags":
+    suite.load_hidden_table(akhr_path or None)
+start = time.perf_counter()
+suite.RESOLVERS[name][1](query)
+print(time.perf_counter() - start)
+"""
+
+
+def load_hidden_table(akhr_path: str = None) -> bool:
+    """
+    Serves akhr.json to the recruitment engine
+
+    Args:
+        akhr_path (str, optional): akhr.json file, the bot's disk cache by default. Defaults to None.
+
+    Returns:
+        bool: Whether akhr.json is available
+    """
+
+    if akhr_path is not None:
+        with open(akhr_path, encoding="utf-8") as f:
+            arknights.set_hidden_table(json.load(f))
+    else:
+        entry = akhr.read_cache()
+        if entry is not None:
+            arknights.set_hidden_table(entry["data"])
+    return arknights.hidden_table is not None
+
+
+def load_corpus(akhr_path: str = None) -> dict:
+    """
+    Reads the recorded queries, with item IDs for get_stage_with_item and tags when akhr.json is available
+
+    Args:
+        akhr_path (str, optional): akhr.json file, the bot's disk cache by default. Defaults to None.
+
+    Returns:
+        dict: A dict that maps corpus name to its queries
+    """
+
+    with open(Path(__file__).parent / "corpus.json", "r", encoding="UTF-8") as f:
+        corpus = json.load(f)
+
+    corpus["item_id"] = list(dict.fromkeys(
+        arknights.get_item(query)["itemId"] for query in corpus["item"]))
+
+    if load_hidden_table(akhr_path):
+        corpus["tags"] = TAG_QUERIES
+
+    return corpus
+
+
+def clear_caches():
+    """ Drops the cached queries, level summaries and embeds of every locale """
+    for game_data in arknights.current.values():
+        for cache in game_data.query_caches.values():
+            cache.clear()
+        game_data.level_cache.clear()
+        game_data.render_cache.clear()
+
+
+def summarize(samples: list) -> dict:
+    """ Latency statistics in milliseconds """
+    if len(samples) == 0:
+        return None
+    samples = sorted(samples)
+    return {
+        "n": len(samples),
+        "min": samples[0] * 1000,
+        "median": statistics.median(samples) * 1000,
+        "mean": statistics.mean(samples) * 1000,
+        "p95": samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1000,
+    }
+
+
+def load_latency(name: str, query, akhr_path: str = None) -> float:
+    output = subprocess.run([sys.executable, "-c", LOAD, name, json.dumps(query), akhr_path or ""],
+                            env=dict(os.environ, PYTHONWARNINGS="ignore"),
+                            check=True, stdout=subprocess.PIPE, universal_newlines=True).stdout
+    return float(output.split()[-1])
+
+
+def bench_resolvers(corpus: dict, repeat: int, akhr_path: str = None) -> dict:
+    results = {}
+    for name, (table, func) in RESOLVERS.items():
+        if table not in corpus:
+            results[name] = {"skipped": "akhr.json is unavailable"}
+            continue
+
+        queries = corpus[table]
+        cold, warm = [], []
+        for _ in range(repeat):
+            for query in queries:
+                clear_caches()
+                start = time.perf_counter()
+                func(query)
+                cold.append(time.perf_counter() - start)
+        for query in queries:
+            func(query)
+        for _ in range(repeat):
+            for query in queries:
+                start = time.perf_counter()
+                func(query)
+                warm.append(time.perf_counter() - start)
+
+        results[name] = {
+            "load": load_latency(name, queries[0], akhr_path) * 1000,
+            "cold": summarize(cold),
+            "warm": summarize(warm),
+        }
+    return results
+
+
+class FakeMessage:
+    """ Sent message, paginator controls do nothing """
+
+    def __init__(self, id: int):
+        self.id = id
+
+    async def add_reaction(self, emoji):
+        pass
+
+    async def clear_reactions(self):
+        pass
+
+    async def delete(self):
+        pass
+
+
+class FakeContext:
+    """ Command context recording the first embed sent """
+
+    bot = SimpleNamespace(user=SimpleNamespace(id=0))
+    author = SimpleNamespace(id=1, avatar_url="")
+    guild = None
+    messages = 0
+
+    def __init__(self):
+        self.channel = self
+        self.sent = asyncio.Event()
+
+    async def send(self, content=None, *, embed=None, **kwargs):
+        # Serialized as discord.py does before sending
+        if embed is not None:
+            embed.to_dict()
+        self.sent.set()
+        FakeContext.messages += 1
+        return FakeMessage(FakeContext.messages)
+
+
+async def invoke(cog, command: str, args: tuple, kwargs: dict) -> float:
+    """ Runs a command until it sends its (first) embed, paginators are then stopped """
+
+    ctx = FakeContext()
+    await cog.cog_check(ctx)
+    start = time.perf_counter()
+    task = asyncio.ensure_future(getattr(cog, command).callback(cog, ctx, *args, **kwargs))
+    sent = asyncio.ensure_future(ctx.sent.wait())
+    await asyncio.wait([task, sent], return_when=asyncio.FIRST_COMPLETED)
+    elapsed = time.perf_counter() - start
+
+    task.cancel()
+    sent.cancel()
+    result = (await asyncio.gather(task, return_exceptions=True))[0]
+    if isinstance(result, Exception):
+        raise result
+    return elapsed
+
+
+async def bench_commands(corpus: dict, repeat: int) -> dict:
+    # Imported here so that resolver timings don't pay for discord.py
+    from amiya.cogs.general import General
+    from amiya.cogs.operator import Operator
+
+    # Tables are loaded on first use, as with WARM_UP=false
+    arknights.ready.set()
+    general, operator = General(FakeContext.bot), Operator(FakeContext.bot)
+    commands = {
+        "stage": (general, "stage", [((query,), {}) for query in corpus["stage"]]),
+        "item": (general, "item", [((), {"item": query}) for query in corpus["item"]]),
+        "enemy": (general, "enemy", [((), {"enemy": query}) for query in corpus["enemy"]]),
+        "furniture": (general, "furniture", [((), {"furniture": query}) for query in corpus["furniture"]]),
+        "recruit": (general, "recruit", [(tuple(tags), {}) for tags in corpus.get("tags", [])]),
+        "recruit +g": (general, "recruit", [((*tags, "+g"), {}) for tags in corpus.get("tags", [])]),
+        "operator file": (operator, "file", [((), {"operator": query}) for query in corpus["operator"]]),
+        "operator audio": (operator, "audio", [((), {"operator": query}) for query in corpus["operator"]]),
+        "operator skins": (operator, "skins", [((), {"operator": query}) for query in corpus["operator"]]),
+    }
+
+    results = {}
+    for name, (cog, command, calls) in commands.items():
+        if len(calls) == 0:
+            results[name] = {"skipped": "akhr.json is unavailable"}
+            continue
+
+        cold, warm, errors = [], [], 0
+        # An untimed run fills the caches for the warm runs
+        for samples, clear in ((cold, True), (None, False), (warm, False)):
+            for _ in range(repeat if samples is not None else 1):
+                for args, kwargs in calls:
+                    if clear:
+                        clear_caches()
+                    try:
+                        elapsed = await invoke(cog, command, args, kwargs)
+                    except Exception:
+                        errors += 1
+                        continue
+                    if samples is not None:
+                        samples.append(elapsed)
+
+        results[name] = {"cold": summarize(cold), "warm": summarize(warm), "errors": errors}
+    return results
+
+
+def git_revision(path: str) -> str:
+    try:
+        return subprocess.run(["git", "-C", path, "rev-parse", "HEAD"], check=True, stdout=subprocess.PIPE,
+                              stderr=subprocess.DEVNULL, universal_newlines=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(previous: dict, results: dict):
+    """ Prints the median latency of both runs """
+
+    print(f"{'':<32} {'previous':>10} {'current':>10} {'ratio':>7}")
+    for section in ("resolvers", "commands"):
+        for name, result in results[section].items():
+            for mode in ("cold", "warm"):
+                before = previous.get(section, {}).get(name, {}).get(mode)
+                after = result.get(mode)
+                if before is None or after is None:
+                    continue
+                print(f'{f"{name} ({mode})":<32} {before["median"]:>7.3f} ms {after["median"]:>7.3f} ms {after["median"] / before["median"]:>6.2f}x')
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.suite")
+    parser.add_argument("--output", help="JSON results file (default: stdout)")
+    parser.add_argument("--compare", help="Previous JSON results to compare with")
+    parser.add_argument("--akhr", help="akhr.json file (default: the bot's disk cache)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs of every query (default: 3)")
+    args = parser.parse_args()
+
+    constants.setup()
+    corpus = load_corpus(args.akhr)
+
+    results = {
+        "meta": {
+            "time": time.time(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "revision": git_revision("."),
+            "data_revision": git_revision("ArknightsData"),
+            "locale": arknights.locale,
+            "repeat": args.repeat,
+        },
+        "resolvers": bench_resolvers(corpus, args.repeat, args.akhr),
+    }
+    results["commands"] = asyncio.get_event_loop().run_until_complete(bench_commands(corpus, args.repeat))
+
+    if args.output is None:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+    else:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    if args.compare is not None:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(json.load(f), results)
+
+
+if __name__ == "__main__":
+    main()